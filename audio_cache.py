@@ -0,0 +1,76 @@
+"""
+Audio segment cache
+Trims a music track to the video duration, applies the fade-out and encodes it
+to AAC once. The segments are kept in AUDIO_CACHE_DIR, keyed by the Drive file
+id and checksum, and every render path muxes them without re-encoding
+"""
+
+import os
+import hashlib
+import logging
+import subprocess
+from moviepy.config import get_setting
+from config import *
+
+AUDIO_SEGMENT_EXT = '.m4a'
+
+
+def file_checksum(path):
+    """MD5 of a local file, the same checksum Drive reports as md5Checksum."""
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def segment_path(checksum, file_id=None, duration=None, fade=None):
+    duration = VIDEO_DURATION_SECONDS if duration is None else duration
+    fade = AUDIO_FADE_OUT_DURATION if fade is None else fade
+    key = f"{file_id}_{checksum}" if file_id else checksum
+    return os.path.join(AUDIO_CACHE_DIR, f"{key}_{duration:g}s_fade{fade:g}{AUDIO_SEGMENT_EXT}")
+
+
+def is_audio_segment(path):
+    """True for files of the audio cache, which are muxed as they are."""
+    return bool(path) and os.path.dirname(os.path.abspath(path)) == os.path.abspath(AUDIO_CACHE_DIR)
+
+
+def cached_segment(checksum, file_id=None, duration=None, fade=None):
+    """Path of an already prepared segment, or None."""
+    path = segment_path(checksum, file_id, duration, fade)
+    return path if os.path.exists(path) else None
+
+
+def prepare_audio_segment(music_file, file_id=None, checksum=None, duration=None, fade=None):
+    """
+    Return the cached segment of music_file, encoding it first if needed. Tracks
+    shorter than the video are padded with silence.
+    """
+    duration = VIDEO_DURATION_SECONDS if duration is None else duration
+    fade = AUDIO_FADE_OUT_DURATION if fade is None else fade
+    checksum = checksum or file_checksum(music_file)
+    path = segment_path(checksum, file_id, duration, fade)
+    if os.path.exists(path):
+        return path
+    os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
+    filters = ['apad']
+    if fade > 0:
+        filters.append(f"afade=t=out:st={max(0, duration - fade):g}:d={fade:g}")
+    # Encode next to the final name and rename, so concurrent renders never see a partial file
+    temp_path = f"{path}.{os.getpid()}.tmp{AUDIO_SEGMENT_EXT}"
+    cmd = [
+        get_setting("FFMPEG_BINARY"), '-y', '-loglevel', 'error',
+        '-i', music_file, '-vn',
+        '-af', ','.join(filters), '-t', f"{duration:g}",
+        '-c:a', 'aac', '-b:a', AUDIO_BITRATE,
+        temp_path,
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise RuntimeError(f"ffmpeg audio preparation failed: {result.stderr.strip()}")
+    os.replace(temp_path, path)
+    logging.info(f"Prepared audio segment {path}")
+    return path
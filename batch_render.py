@@ -0,0 +1,108 @@
+"""
+Batch rendering
+Renders many quote videos in one warm process pool. Each worker keeps a single
+VideoCreator (fonts, layouts and background) for all the videos it renders;
+music comes from the audio segment cache, or without it from one decoded
+AudioFileClip per track and worker
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from moviepy.editor import AudioFileClip
+from config import *
+from video_creator import VideoCreator
+import memory_budget
+
+# Per-worker state, set up once by init_worker
+worker_creator = None
+worker_audio = {}
+
+
+def init_worker(memory_budget_mb=None):
+    global worker_creator
+    worker_creator = VideoCreator()
+    if memory_budget_mb is not None:
+        # Each worker renders its videos within its share of the budget
+        memory_budget.MEMORY_BUDGET_MB = memory_budget_mb
+
+
+def shared_audio(music_file):
+    """The worker's decoded clip of music_file, opened on first use."""
+    if music_file not in worker_audio:
+        worker_audio[music_file] = AudioFileClip(music_file)
+    return worker_audio[music_file]
+
+
+def batch_render_mode():
+    # The batch pool already spreads videos over the cores, so a video is not split further
+    return 'single' if RENDER_MODE == 'parallel' else RENDER_MODE
+
+
+def render_batch_item(item):
+    """Render one batch item in a worker. Returns a result dict, with 'error' set on failure."""
+    if worker_creator is None:
+        init_worker()
+    result = dict(item)
+    start = time.perf_counter()
+    try:
+        render_mode = batch_render_mode()
+        # Only needed when the music is re-encoded per video
+        audio = shared_audio(item['music_file']) if render_mode == 'single' and not AUDIO_CACHE_ENABLED else None
+        worker_creator.render_video(item['quote'], item['author'], item['effect'], item['music_file'],
+                                    item['filename'], render_mode=render_mode, audio=audio)
+        result['size_bytes'] = os.path.getsize(item['filename'])
+        result['error'] = None
+    except Exception as e:
+        logging.error(f"Error rendering batch video {item['filename']}: {e}")
+        result['size_bytes'] = 0
+        result['error'] = str(e)
+    result['seconds'] = round(time.perf_counter() - start, 2)
+    return result
+
+
+def summarize_batch(results, wall_seconds):
+    """Aggregate throughput of a finished batch."""
+    rendered = [r for r in results if not r['error']]
+    render_seconds = sum(r['seconds'] for r in rendered)
+    return {
+        'videos': len(rendered),
+        'failed': len(results) - len(rendered),
+        'wall_seconds': round(wall_seconds, 2),
+        'videos_per_minute': round(len(rendered) * 60 / wall_seconds, 2) if wall_seconds else 0,
+        'mean_video_seconds': round(render_seconds / len(rendered), 2) if rendered else 0,
+        # Seconds of finished video per wall-clock second
+        'realtime_factor': round(len(rendered) * VIDEO_DURATION_SECONDS / wall_seconds, 2) if wall_seconds else 0,
+        'total_bytes': sum(r['size_bytes'] for r in rendered),
+    }
+
+
+def render_batch(items, workers=None):
+    """
+    Render items (dicts with quote, author, effect, music_file and filename) in
+    `workers` processes (BATCH_WORKERS by default). Returns (results, summary).
+    """
+    workers = max(1, min(workers or BATCH_WORKERS, len(items)))
+    workers = memory_budget.batch_workers_within_budget(workers, batch_render_mode())
+    logging.info(f"Rendering a batch of {len(items)} videos with {workers} workers")
+    results = []
+    start = time.perf_counter()
+    worker_budget = MEMORY_BUDGET_MB / workers if MEMORY_BUDGET_MB else None
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(worker_budget,)) as pool:
+        futures = [pool.submit(render_batch_item, item) for item in items]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result['error']:
+                logging.error(f"[{len(results)}/{len(items)}] {result['filename']} failed after {result['seconds']}s")
+            else:
+                logging.info(f"[{len(results)}/{len(items)}] {result['filename']} ({result['effect']}) "
+                             f"rendered in {result['seconds']}s, {result['size_bytes'] / 1024:.0f} KB")
+    summary = summarize_batch(results, time.perf_counter() - start)
+    logging.info(f"Batch done: {summary['videos']} videos ({summary['failed']} failed) in {summary['wall_seconds']}s, "
+                 f"{summary['videos_per_minute']} videos/min, {summary['mean_video_seconds']}s per video, "
+                 f"{summary['realtime_factor']}x realtime")
+    order = {item['filename']: i for i, item in enumerate(items)}
+    results.sort(key=lambda r: order[r['filename']])
+    return results, summary
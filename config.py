@@ -18,6 +18,11 @@ GOOGLE_CREDENTIALS_PATH = 'credentials.json'
 # --- GOOGLE SHEETS CONFIG ---
 SHEET_NAME = 'Instagram quotes'  # The name of your Google Sheet
 SHEET_WORKSHEET_INDEX = 0       # 0 for the first sheet
+SHEETS_HTTP_POOL_SIZE = 4  # Keep-alive connections of the shared Sheets session
+SHEETS_PAGE_SIZE = 500  # Rows per request when quotes are streamed from the sheet (without the mirror)
+QUOTES_MIRROR_ENABLED = True  # Keep a local SQLite copy of the quotes sheet, downloaded only when it changes
+QUOTES_MIRROR_PATH = 'quotes_mirror.sqlite3'
+SHEET_JOURNAL_PATH = 'sheet_journal.sqlite3'  # Sheet updates waiting to be written, flushed in one batch at the end of each run
 
 # --- SEQUENTIAL PROCESSING ---
 SEQUENTIAL_MODE = True  # Process quotes and music in order, not randomly
@@ -51,12 +56,87 @@ DEFAULT_HASHTAGS = [
     "#mindset", "#success", "#life", "#wisdom", "#positivevibes"
 ]
 
+# --- API QUOTAS ---
+# Token bucket per API: sustained requests per second and burst size
+API_RATE_LIMITS = {
+    'sheets': {'rate': 1.0, 'burst': 10},  # Sheets: 60 read and 60 write requests per minute per user
+    'drive': {'rate': 10.0, 'burst': 20},  # Drive: 12,000 queries per minute, kept well below the per-user limit
+    'graph': {'rate': 200 / 3600, 'burst': 25},  # Graph API: 200 calls per hour per Instagram account
+}
+API_RETRY_ATTEMPTS = 5  # Retries of a throttled (429/5xx) or dropped request
+API_RETRY_BASE_DELAY = 1.0  # Seconds; doubled each retry, with full jitter
+API_RETRY_MAX_DELAY = 60.0
+
 # --- VIDEO SETTINGS ---
 VIDEO_WIDTH = 1080
 VIDEO_HEIGHT = 1920  # For Instagram Reels/Stories
 VIDEO_DURATION_SECONDS = 15  # Increased for better engagement
 VIDEO_FPS = 30  # Higher FPS for smoother transitions
 
+# --- RENDERING ---
+RENDER_MODE = 'single'  # 'single' (one MoviePy process), 'parallel' (segments in a process pool) or 'pipe' (raw frames to ffmpeg)
+RENDER_WORKERS = os.cpu_count() or 1  # Worker processes for parallel rendering
+RENDER_SEGMENTS = 0  # Timeline segments for parallel rendering (0 = one per worker)
+BATCH_WORKERS = os.cpu_count() or 1  # Worker processes for batch rendering (main.py --batch)
+BATCH_OUTPUT_DIR = 'batch_videos'  # Where batch renders and their manifest are written
+
+# --- RENDER CACHE ---
+RENDER_CACHE_ENABLED = True  # Reuse an already rendered video when a post is retried
+RENDER_CACHE_DIR = 'render_cache'
+RENDER_CACHE_MAX_MB = 1024  # Least recently used videos are evicted above this
+
+# --- ENCODING ---
+# x264 settings per profile: preset, crf (None = x264 default), maxrate/bufsize
+# bitrate cap, tune, keyframe_interval (seconds), threads (None = auto), faststart
+ENCODING_PROFILE = 'balanced'
+ENCODING_PROFILES = {
+    'legacy': {  # What write_videofile used before profiles existed
+        'preset': 'medium',
+        'crf': None,
+        'maxrate': None,
+        'bufsize': None,
+        'tune': None,
+        'keyframe_interval': None,
+        'threads': None,
+        'faststart': False,
+    },
+    'fast': {
+        'preset': 'superfast',
+        'crf': 23,
+        'maxrate': None,
+        'bufsize': None,
+        'tune': None,
+        'keyframe_interval': 10,
+        'threads': None,
+        'faststart': True,
+    },
+    'balanced': {
+        'preset': 'veryfast',
+        'crf': 23,
+        'maxrate': '4M',
+        'bufsize': '8M',
+        'tune': None,
+        'keyframe_interval': 10,
+        'threads': None,
+        'faststart': True,
+    },
+    'small': {
+        'preset': 'slow',
+        'crf': 28,
+        'maxrate': '2M',
+        'bufsize': '4M',
+        'tune': 'stillimage',
+        'keyframe_interval': 10,
+        'threads': None,
+        'faststart': True,
+    },
+}
+
+# --- AUDIO ---
+AUDIO_CACHE_ENABLED = True  # Mux pre-trimmed, pre-faded AAC segments instead of re-encoding the music per video
+AUDIO_CACHE_DIR = 'audio_cache'  # One segment per (track, duration, fade)
+AUDIO_BITRATE = '192k'
+
 # --- TEXT STYLING ---
 QUOTE_FONT_SIZE = 60  # Reduced from 80 for better fit
 QUOTE_COLOR = 'white'
@@ -68,11 +148,23 @@ AUTHOR_COLOR = 'white'  # Changed from gold to white for better visibility
 AUTHOR_FONT = 'Arial'
 AUTHOR_POSITION_Y = 0.75  # Percentage from top (0.75 = 75% down)
 
+FONT_PATHS = [
+    "fonts/HelveticaNeue-UltraLight.ttf"  # Only use Helvetica Neue Ultra Light
+]
+LAYOUT_CACHE_SIZE = 512  # Wrapped (text, font, size, width) layouts kept in memory
+
 # --- TEXT EFFECTS ---
 TEXT_FADE_IN_DURATION = 1.5  # seconds
 TEXT_FADE_OUT_DURATION = 1.5  # seconds
 TEXT_EFFECT_DURATION = 3.0  # Maximum effect duration
 TEXT_STAGGER_DELAY = 0.8  # Delay between quote and author appearing
+BLUR_MAX_RADIUS = 20  # Starting blur radius of the 'blur' effect
+DIAMOND_BLUR_RADII = [30, 20, 10]  # Starting radii of the 'diamond_blur' layers
+BLUR_CLEAR_DURATION = 1.0  # Seconds until blurred text is fully sharp
+BLUR_CACHE_LEVELS = 12  # Distinct blur strengths rendered (and cached) per text layer
+BLUR_BACKEND = 'pil'  # 'pil' (GaussianBlur), 'numpy' (fast_blur box approximation) or 'auto' (numpy from BLUR_NUMPY_MIN_RADIUS up)
+BLUR_NUMPY_MIN_RADIUS = 10  # With 'auto', smaller radii stay on PIL, which is faster there
+TEXT_LAYER_PADDING = 90  # Pixels kept around the text crop so blurs can spread (3x the largest radius)
 
 # --- AVAILABLE EFFECTS ---
 AVAILABLE_EFFECTS = [
@@ -99,6 +191,19 @@ OPTIMAL_POSTING_TIMES = [
     "20:00",  # 8 PM
 ]
 
+# --- PREVIEWS ---
+PREVIEW_DIR = 'previews'  # main.py --preview output
+PREVIEW_SCALE = 0.25  # Preview size relative to VIDEO_WIDTH x VIDEO_HEIGHT (frames are laid out at full size)
+PREVIEW_FPS = 10  # Frame rate of video previews
+PREVIEW_CRF = 30  # x264 quality of video previews (higher = smaller)
+PREVIEW_KEYFRAME_TIME = 2.5  # Seconds into the video of PNG previews; by then every effect has settled
+
+# --- RENDER-AHEAD QUEUE ---
+RENDER_AHEAD_COUNT = 4  # Reels kept rendered ahead of the posting slots (main.py --render-ahead)
+RENDER_QUEUE_DIR = 'render_queue'
+RESERVATION_TTL_HOURS = 48  # A 'Reserved' quote is released if it was not posted within this time
+RESERVATION_SETTLE_SECONDS = 3  # Wait before reading a reservation back to detect a competing producer
+
 # --- AUTOMATION SETTINGS ---
 MAX_VIDEOS_TO_KEEP = 10  # Number of recent videos to keep
 AUTOMATION_LOG_DIR = 'logs'
@@ -107,6 +212,16 @@ AUTOMATION_LOG_DIR = 'logs'
 LOG_LEVEL = 'INFO'
 LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
 
+# --- METRICS ---
+METRICS_ENABLED = True  # Record duration, bytes and retries of every pipeline stage
+METRICS_FILE = 'metrics.jsonl'  # One JSON line per stage and per run
+METRICS_PROMETHEUS_FILE = None  # e.g. 'metrics.prom' for node_exporter's textfile collector; None to skip
+
+# --- MEMORY ---
+MEMORY_BUDGET_MB = 0  # Peak memory of a render incl. ffmpeg and workers; over it, lower-memory strategies are used (0 = no budget)
+MEMORY_TRACEMALLOC = False  # Trace Python allocations per stage (slows rendering down)
+MEMORY_TOP_ALLOCATORS = 5  # Allocation sites listed per stage with MEMORY_TRACEMALLOC
+
 # --- VALIDATION ---
 def validate_config():
     """Validate that all required paths and settings are correct."""
@@ -0,0 +1,103 @@
+"""
+Text effect registry
+Each effect declares its time-varying parameters as keyframe envelopes. They
+are evaluated once per render into a KeyframeTable at the target FPS, so the
+renderers only look values up per frame and can tell from the table when a
+layer stops changing
+"""
+
+import numpy as np
+from config import *
+from video_creator import render_blur, render_blur_levels, render_diamond_blur, render_diamond_blur_levels
+
+# Parameters an effect can animate:
+#   brightness  multiplies the layer's color (0 = black), like MoviePy's fadein/fadeout
+#   blur        strength 0..1 passed to the effect's blur renderer
+EFFECTS = {}
+
+
+class KeyframeTable:
+    """An effect's parameters sampled at every frame: values[name][i] is the value at t = i / fps."""
+
+    def __init__(self, values, duration, fps):
+        self.values = values
+        self.duration = duration
+        self.fps = fps
+        self.frames = int(round(duration * fps)) + 1
+
+    def index(self, t):
+        return min(max(int(round(t * self.fps)), 0), self.frames - 1)
+
+    def value(self, name, t, default=None):
+        """The parameter at clip time t (the nearest frame), or default if the effect does not set it."""
+        values = self.values.get(name)
+        return default if values is None else values[self.index(t)]
+
+    def change_spans(self):
+        """Clip-time (start, end) spans in which some parameter changes from frame to frame."""
+        changed = np.zeros(self.frames, dtype=bool)
+        for values in self.values.values():
+            changed[1:] |= values[1:] != values[:-1]
+        spans = []
+        for i in np.flatnonzero(changed):
+            start, end = (i - 1) / self.fps, i / self.fps
+            if spans and spans[-1][1] >= start:
+                spans[-1] = (spans[-1][0], end)
+            else:
+                spans.append((start, end))
+        return spans
+
+
+class Effect:
+    """
+    A text effect. `envelopes(duration)` returns {parameter: [envelope, ...]}, each
+    envelope a list of (clip time, value) keyframes interpolated linearly and held
+    before the first and after the last; a parameter is the product of its envelopes.
+    blur_render(frame, strength) renders the 'blur' parameter, and
+    blur_render_levels(frame, strengths) several strengths of it at once.
+    """
+
+    def __init__(self, name, envelopes, blur_render=None, blur_render_levels=None):
+        self.name = name
+        self.envelopes = envelopes
+        self.blur_render = blur_render
+        self.blur_render_levels = blur_render_levels
+
+    def keyframes(self, duration, fps=None):
+        """Evaluate the envelopes at every frame of a layer lasting `duration` seconds."""
+        fps = fps or VIDEO_FPS
+        times = np.arange(int(round(duration * fps)) + 1) / fps
+        values = {}
+        for name, envelopes in self.envelopes(duration).items():
+            values[name] = np.ones(len(times))
+            for keyframes in envelopes:
+                key_times, key_values = zip(*keyframes)
+                values[name] *= np.interp(times, key_times, key_values)
+        return KeyframeTable(values, duration, fps)
+
+
+def register_effect(effect):
+    EFFECTS[effect.name] = effect
+    return effect
+
+
+def get_effect(name):
+    """The registered effect called name. Unknown effects fall back to 'fade'."""
+    return EFFECTS.get(name, EFFECTS['fade'])
+
+
+register_effect(Effect('fade', lambda duration: {
+    'brightness': [
+        [(0, 0), (TEXT_FADE_IN_DURATION * 0.5, 1)],  # Faster fade-in
+        [(duration - TEXT_FADE_OUT_DURATION, 1), (duration, 0)],
+    ],
+}))
+
+# Blur strong at the start, sharp once BLUR_CLEAR_DURATION has passed; no fade in/out
+register_effect(Effect('blur', lambda duration: {
+    'blur': [[(0, 1), (BLUR_CLEAR_DURATION, 0)]],
+}, render_blur, render_blur_levels))
+
+register_effect(Effect('diamond_blur', lambda duration: {
+    'blur': [[(0, 1), (BLUR_CLEAR_DURATION, 0)]],
+}, render_diamond_blur, render_diamond_blur_levels))
@@ -0,0 +1,91 @@
+"""
+Encoding profile benchmark
+Renders a reference reel once (lossless), encodes it under each profile in
+config.ENCODING_PROFILES and reports encode time, file size and SSIM
+
+Usage: python encode_benchmark.py [--profiles fast small] [--effect diamond_blur] [--json results.json]
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from moviepy.config import get_setting
+from config import *
+from encoding import get_encoding_profile, ffmpeg_video_args
+from pipe_render import PipeRenderer, build_pipe_layers
+
+REFERENCE_QUOTE = "The only way to do great work is to love what you do. If you haven't found it yet, keep looking. Don't settle."
+REFERENCE_AUTHOR = "Steve Jobs"
+LOSSLESS_VIDEO_ARGS = ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-preset', 'ultrafast', '-qp', '0']
+
+
+def run_ffmpeg(args):
+    result = subprocess.run([get_setting("FFMPEG_BINARY"), '-y', '-nostdin'] + args,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()[-500:]}")
+    return result.stderr
+
+
+def render_reference(path, effect):
+    """Render the reference reel losslessly so every profile encodes the same frames."""
+    layers = build_pipe_layers(REFERENCE_QUOTE, REFERENCE_AUTHOR, effect)
+    PipeRenderer(layers).write(path, video_args=LOSSLESS_VIDEO_ARGS)
+
+
+def ssim_score(encoded_path, reference_path):
+    """Mean SSIM of the encoded video against the reference (1.0 = identical)."""
+    stderr = run_ffmpeg(['-i', encoded_path, '-i', reference_path, '-lavfi', 'ssim', '-f', 'null', '-'])
+    match = re.search(r'All:([\d.]+)', stderr)
+    return float(match.group(1)) if match else None
+
+
+def benchmark_profile(name, reference_path, output_dir):
+    profile = get_encoding_profile(name)
+    output_path = os.path.join(output_dir, f"{name}.mp4")
+    start = time.perf_counter()
+    run_ffmpeg(['-loglevel', 'error', '-i', reference_path] + ffmpeg_video_args(profile) + [output_path])
+    encode_seconds = time.perf_counter() - start
+    return {
+        'profile': name,
+        'encode_seconds': round(encode_seconds, 2),
+        'size_bytes': os.path.getsize(output_path),
+        'ssim': ssim_score(output_path, reference_path),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the encoding profiles on a reference reel.")
+    parser.add_argument('--profiles', nargs='+', default=list(ENCODING_PROFILES),
+                        help="Profiles to compare (default: all)")
+    parser.add_argument('--effect', default='diamond_blur', choices=AVAILABLE_EFFECTS,
+                        help="Text effect of the reference reel")
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='encode_benchmark_')
+    try:
+        reference_path = os.path.join(work_dir, 'reference.mp4')
+        print(f"Rendering {VIDEO_DURATION_SECONDS}s reference reel ({args.effect})...")
+        render_reference(reference_path, args.effect)
+        results = [benchmark_profile(name, reference_path, work_dir) for name in args.profiles]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'profile':<12}{'encode (s)':>12}{'size (KB)':>12}{'SSIM':>10}")
+    for result in results:
+        ssim = f"{result['ssim']:.5f}" if result['ssim'] is not None else 'n/a'
+        print(f"{result['profile']:<12}{result['encode_seconds']:>12.2f}{result['size_bytes'] / 1024:>12.0f}{ssim:>10}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'effect': args.effect, 'duration': VIDEO_DURATION_SECONDS, 'results': results}, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
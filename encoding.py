@@ -0,0 +1,49 @@
+"""
+x264 encoding profiles
+Turns the named profiles in config.ENCODING_PROFILES into ffmpeg arguments
+for every render path
+"""
+
+from config import ENCODING_PROFILE, ENCODING_PROFILES, VIDEO_FPS
+
+
+def get_encoding_profile(name=None):
+    """Return the settings of an encoding profile (ENCODING_PROFILE by default)."""
+    name = name or ENCODING_PROFILE
+    if name not in ENCODING_PROFILES:
+        raise ValueError(f"Unknown encoding profile: {name}")
+    return ENCODING_PROFILES[name]
+
+
+def x264_options(profile, fps=None):
+    """Encoder options other than the preset and threads, as ffmpeg arguments."""
+    args = []
+    if profile.get('crf') is not None:
+        args += ['-crf', str(profile['crf'])]
+    if profile.get('maxrate'):
+        args += ['-maxrate', profile['maxrate'], '-bufsize', profile.get('bufsize') or profile['maxrate']]
+    if profile.get('tune'):
+        args += ['-tune', profile['tune']]
+    if profile.get('keyframe_interval'):
+        args += ['-g', str(int(round(profile['keyframe_interval'] * (fps or VIDEO_FPS))))]
+    if profile.get('faststart'):
+        args += ['-movflags', '+faststart']
+    return args
+
+
+def ffmpeg_video_args(profile, fps=None):
+    """Complete ffmpeg output arguments for the video stream."""
+    args = ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-preset', profile['preset']]
+    if profile.get('threads') is not None:
+        args += ['-threads', str(profile['threads'])]
+    return args + x264_options(profile, fps)
+
+
+def moviepy_write_kwargs(profile, fps=None):
+    """Keyword arguments for MoviePy's write_videofile."""
+    return {
+        'codec': 'libx264',
+        'preset': profile['preset'],
+        'threads': profile.get('threads'),
+        'ffmpeg_params': x264_options(profile, fps),
+    }
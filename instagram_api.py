@@ -10,6 +10,7 @@ import logging
 from datetime import datetime
 from typing import Optional, Dict, Any
 import time
+from request_scheduler import request_scheduler
 
 class InstagramAPI:
     def __init__(self, access_token: str, ig_user_id: str, upload_to_drive=None, drive_service=None):
@@ -39,7 +40,7 @@ class InstagramAPI:
                 'access_token': self.access_token
             }
             
-            response = requests.get(url, params=params)
+            response = request_scheduler().call('graph', requests.get, url, params=params)
             response.raise_for_status()
             
             data = response.json()
@@ -66,7 +67,7 @@ class InstagramAPI:
                 'access_token': self.access_token,
                 'media_type': 'REELS'
             }
-            response = requests.post(url, data=data)
+            response = request_scheduler().call('graph', requests.post, url, data=data, idempotent=False)
             response.raise_for_status()
             result = response.json()
             if 'error' in result:
@@ -96,7 +97,7 @@ class InstagramAPI:
                 'access_token': self.access_token
             }
 
-            response = requests.post(url, data=data)
+            response = request_scheduler().call('graph', requests.post, url, data=data, idempotent=False)
             response.raise_for_status()
 
             result = response.json()
@@ -138,7 +139,7 @@ class InstagramAPI:
             
             # Search for the file in Google Drive
             query = f"name='{filename}' and trashed=false"
-            results = self.drive_service.files().list(q=query).execute()
+            results = request_scheduler().execute('drive', self.drive_service.files().list(q=query))
             files = results.get('files', [])
             
             if not files:
@@ -148,11 +149,11 @@ class InstagramAPI:
             file_id = files[0]['id']
             
             # Make the file publicly accessible
-            self.drive_service.permissions().create(
+            request_scheduler().execute('drive', self.drive_service.permissions().create(
                 fileId=file_id,
                 body={'type': 'anyone', 'role': 'reader'},
                 fields='id'
-            ).execute()
+            ), idempotent=False)
             
             # Get the shareable link
             shareable_url = f"https://drive.google.com/uc?export=download&id={file_id}"
@@ -185,7 +186,7 @@ class InstagramAPI:
             status_code = None
             for i in range(12):  # Try for up to 2 minutes (12 x 10s)
                 status_url = f"{self.base_url}/{media_id}?fields=status_code&access_token={self.access_token}"
-                status_resp = requests.get(status_url)
+                status_resp = request_scheduler().call('graph', requests.get, status_url)
                 status_code = status_resp.json().get("status_code")
                 logging.info(f"Check {i+1}: status_code = {status_code}")
                 if status_code == "FINISHED":
@@ -220,7 +221,7 @@ class InstagramAPI:
                 'access_token': self.access_token
             }
             
-            response = requests.get(url, params=params)
+            response = request_scheduler().call('graph', requests.get, url, params=params)
             response.raise_for_status()
             
             return response.json()
@@ -238,10 +239,10 @@ class InstagramAPI:
                 'type': 'anyone',
                 'role': 'reader'
             }
-            self.drive_service.permissions().create(
+            request_scheduler().execute('drive', self.drive_service.permissions().create(
                 fileId=file_id,
                 body=permission
-            ).execute()
+            ), idempotent=False)
             logging.info(f"Set file {file_id} to public")
             return True
         except Exception as e:
@@ -1,6 +1,7 @@
 import os
 import json
 import random
+import argparse
 import gspread
 import gspread.exceptions
 import pandas as pd
@@ -20,6 +21,14 @@ from instagram_api import InstagramAPI
 import requests
 import io
 from video_creator import VideoCreator
+from audio_cache import cached_segment, prepare_audio_segment
+from render_cache import RenderCache, render_key
+from render_queue import RenderQueue, posting_slots, reservation_token, reservation_active
+from metrics import active_stage, finish_run, stage, start_run, timed
+from sheets_gateway import sheets_gateway
+from quotes_mirror import QuotesMirror, is_used
+from sheet_journal import sheet_journal
+from request_scheduler import request_scheduler
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 import pickle
@@ -49,21 +58,13 @@ MANAGE_QUOTES_IN_SHEET = False  # Set to False to skip quote deletion/marking (i
 
 # Add these helper functions near the top (after imports and config):
 def get_music_index_from_sheet():
-    import gspread, os, tempfile
-    google_creds_json = os.getenv('GOOGLE_APPLICATION_CREDENTIALS_JSON')
-    if not google_creds_json:
-        raise Exception("GOOGLE_APPLICATION_CREDENTIALS_JSON environment variable not set.")
-    
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-        f.write(google_creds_json)
-        temp_creds_path = f.name
-
-    gc = gspread.service_account(filename=temp_creds_path)
-    sh = gc.open_by_url(os.getenv('SHEET_URL'))
-    worksheet = sh.worksheet("Quotes")  # Or your actual sheet name
+    worksheet = sheets_gateway().worksheet(url=os.getenv('SHEET_URL'), title="Quotes")  # Or your actual sheet name
 
     try:
-        value = worksheet.acell("D2").value  # Assuming music_index is at D2
+        # An index journaled by an earlier run but not written yet is the current one
+        value = sheet_journal().pending_value(2, 'music_index')
+        if value is None:
+            value = worksheet.acell("D2").value  # Assuming music_index is at D2
         logging.info(f"Raw value fetched from D2: {value}")
         return int(value or 0)
     except Exception as e:
@@ -75,44 +76,16 @@ def get_music_index_from_sheet():
 
 
 def set_music_index_in_sheet(index):
-    import gspread, os, tempfile
-    import logging
     import traceback
 
-    google_creds_json = os.getenv('GOOGLE_APPLICATION_CREDENTIALS_JSON')
-    if not google_creds_json:
-        raise Exception("GOOGLE_APPLICATION_CREDENTIALS_JSON environment variable not set.")
-    
     try:
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-            f.write(google_creds_json)
-            temp_creds_path = f.name
-
-        gc = gspread.service_account(filename=temp_creds_path)
-        worksheet = gc.open(SHEET_NAME).get_worksheet(SHEET_WORKSHEET_INDEX)
-
-        header_row = worksheet.row_values(1)
-        logging.info(f"Columns found: {header_row}")
-        if 'music_index' not in header_row:
-            raise Exception("'music_index' column not found in sheet")
-
-        col_index = header_row.index('music_index') + 1
-        logging.info(f"Attempting to update cell (2, {col_index}) to {index}")
-        worksheet.update_cell(2, col_index, str(index))
-        logging.info("Successfully updated music_index")
-
-        confirm = worksheet.cell(2, col_index).value
-        if str(confirm) != str(index):
-            logging.warning(f"Update mismatch: wrote {index}, but read back {confirm}")
-        else:
-            logging.info(f"Confirmed update: music_index = {confirm}")
+        # Written with the run's other sheet updates when the journal is flushed
+        sheet_journal().record(2, 'music_index', str(index))
+        logging.info(f"Journaled music_index = {index}")
 
     except Exception as e:
         logging.error(f"Exception while updating music index: {e}")
         logging.error(traceback.format_exc())
-    finally:
-        if 'temp_creds_path' in locals() and os.path.exists(temp_creds_path):
-            os.unlink(temp_creds_path)
 
 
 class InstagramAIAgent:
@@ -121,6 +94,8 @@ class InstagramAIAgent:
         self.drive_service = None
         self.instagram_api = None
         self.video_creator = VideoCreator()
+        self.render_cache = RenderCache() if RENDER_CACHE_ENABLED else None
+        self.quotes_mirror = QuotesMirror() if QUOTES_MIRROR_ENABLED else None
         
         if USE_GOOGLE_DRIVE:
             self.setup_google_drive()
@@ -194,7 +169,7 @@ class InstagramAIAgent:
         try:
             # Search for existing folder
             query = f"name='{DRIVE_FOLDER_NAME}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-            results = self.drive_service.files().list(q=query).execute()
+            results = request_scheduler().execute('drive', self.drive_service.files().list(q=query))
             files = results.get('files', [])
             
             if files:
@@ -205,13 +180,16 @@ class InstagramAIAgent:
                 'name': DRIVE_FOLDER_NAME,
                 'mimeType': 'application/vnd.google-apps.folder'
             }
-            folder = self.drive_service.files().create(body=folder_metadata, fields='id').execute()
+            folder = request_scheduler().execute(
+                'drive', self.drive_service.files().create(body=folder_metadata, fields='id'),
+                idempotent=False)
             logging.info(f"Created Google Drive folder: {DRIVE_FOLDER_NAME}")
             return folder.get('id')
         except Exception as e:
             logging.error(f"Error creating Drive folder: {e}")
             return None
     
+    @timed('drive_upload')
     def upload_to_drive(self, file_path, filename):
         """Upload video to Google Drive."""
         if not self.drive_service or not DRIVE_FOLDER_ID:
@@ -224,13 +202,14 @@ class InstagramAIAgent:
                 'name': filename,
                 'parents': [DRIVE_FOLDER_ID]
             }
+            active_stage().bytes = os.path.getsize(file_path)
             media = MediaFileUpload(file_path, resumable=True)
-            file = self.drive_service.files().create(
+            file = request_scheduler().execute('drive', self.drive_service.files().create(
                 body=file_metadata,
                 media_body=media,
                 fields='id',
                 supportsAllDrives=True
-            ).execute()
+            ), idempotent=False)
             file_id = file.get('id')
             print(f"[Drive] Upload complete! File ID: {file_id}")
             logging.info(f"Uploaded to Google Drive: {filename} (ID: {file_id})")
@@ -243,11 +222,11 @@ class InstagramAIAgent:
                     'type': 'anyone',
                     'role': 'reader'
                 }
-                drive_service.permissions().create(
+                request_scheduler().execute('drive', drive_service.permissions().create(
                     fileId=file_id,
                     body=permission,
                     supportsAllDrives=True
-                ).execute()
+                ), idempotent=False)
                 print(f"[Drive] File {file_id} is now public.")
                 logging.info(f"Made file {file_id} public.")
             except Exception as e:
@@ -280,8 +259,7 @@ class InstagramAIAgent:
     def list_available_sheets(self):
         """List all available Google Sheets to help debug sheet access."""
         try:
-            gc = gspread.service_account(filename=GOOGLE_CREDENTIALS_PATH)
-            all_sheets = gc.openall()
+            all_sheets = sheets_gateway().open_all()
             
             if not all_sheets:
                 logging.info("No Google Sheets found. Please check:")
@@ -296,22 +274,18 @@ class InstagramAIAgent:
         except Exception as e:
             logging.error(f"Error listing sheets: {e}")
     
+    @timed('sheet_fetch')
     def get_quotes_from_sheet(self):
         """Fetch quotes from Google Sheets."""
         try:
-            import tempfile
-            import os
-            google_creds_json = os.getenv('GOOGLE_APPLICATION_CREDENTIALS_JSON')
-            if not google_creds_json:
-                raise Exception("GOOGLE_APPLICATION_CREDENTIALS_JSON environment variable not set.")
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-                f.write(google_creds_json)
-                temp_creds_path = f.name
-            gc = gspread.service_account(filename=temp_creds_path)
-            os.unlink(temp_creds_path)
-            worksheet = gc.open(SHEET_NAME).get_worksheet(SHEET_WORKSHEET_INDEX)
-            records = worksheet.get_all_records()
-            df = pd.DataFrame(records)
+            worksheet = self.quotes_worksheet()
+            if self.quotes_mirror:
+                # Downloads the sheet only if it changed since the last run
+                self.quotes_mirror.sync(worksheet, pending=sheet_journal().pending())
+                df = self.quotes_mirror.dataframe()
+            else:
+                records = worksheet.get_all_records()
+                df = self.apply_journaled_updates(pd.DataFrame(records))
             
             # Check if we have the required columns
             required_columns = ['Quote', 'Author']
@@ -327,6 +301,7 @@ class InstagramAIAgent:
                 logging.error("Google Sheet is empty. Please add some quotes.")
                 return None
             
+            active_stage().set(rows=len(df))
             logging.info(f"Successfully fetched {len(df)} quotes from Google Sheets.")
             logging.info(f"Columns found: {list(df.columns)}")
             return df
@@ -335,49 +310,151 @@ class InstagramAIAgent:
             logging.error(f"Error connecting to Google Sheets: {e}")
             return None
     
-    def get_sequential_quote(self, quotes_df):
-        """Get the next unused quote from the sheet (where 'Used' is not set). Returns (quote, author, index)."""
-        if quotes_df is None or quotes_df.empty:
-            return None, None, None
-        # Only consider quotes where 'Used' is not set/empty/false
+    def apply_journaled_updates(self, quotes_df):
+        """quotes_df with the journaled cell updates not yet written to the sheet applied."""
+        for row, column_name, value in sheet_journal().pending():
+            if row - 2 in quotes_df.index:
+                if column_name not in quotes_df.columns:
+                    quotes_df[column_name] = ''
+                quotes_df.loc[row - 2, column_name] = value
+        return quotes_df
+
+    def get_unused_quotes(self, quotes_df, include_reserved=False):
+        """
+        Rows of quotes_df whose 'Used' is not set/empty/false. Quotes reserved by
+        the render-ahead queue are left out unless include_reserved is set.
+        """
         unused_mask = ~quotes_df.get('Used', '').astype(str).str.lower().isin(['yes', 'true', '1'])
-        unused_quotes = quotes_df[unused_mask]
-        if unused_quotes.empty:
+        if not include_reserved and 'Reserved' in quotes_df.columns:
+            unused_mask &= ~quotes_df['Reserved'].apply(reservation_active)
+        return quotes_df[unused_mask]
+
+    @timed('quote_select')
+    def next_mirrored_quote(self):
+        """
+        The next quote, author and index through the quotes mirror. The first unused,
+        unreserved quote is an index lookup, and the sheet is only downloaded if it changed.
+        When every quote is used, 'Used' is reset and the first one is returned.
+        """
+        try:
+            worksheet = self.quotes_worksheet()
+            self.quotes_mirror.sync(worksheet, pending=sheet_journal().pending())
+        except Exception as e:
+            logging.error(f"Error connecting to Google Sheets: {e}")
+            return None, None, None
+        missing_columns = [col for col in ['Quote', 'Author'] if col not in self.quotes_mirror.header()]
+        if missing_columns:
+            logging.error(f"Missing required columns in Google Sheet: {missing_columns}")
+            return None, None, None
+        reserved = lambda row: reservation_active(row['reserved'])
+        row = self.quotes_mirror.next_unused(skip=reserved)
+        if row is None and self.quotes_mirror.next_unused() is not None:
+            logging.error("All unused quotes are reserved by the render-ahead queue.")
+            return None, None, None
+        if row is None:
+            if not self.quotes_mirror.count():
+                logging.error("Google Sheet is empty. Please add some quotes.")
+                return None, None, None
             logging.info("All quotes have been used. Resetting 'Used' column for all quotes.")
-            # Reset all 'Used' values to blank
-            import gspread
-            google_creds_json = os.getenv('GOOGLE_APPLICATION_CREDENTIALS_JSON')
-            if google_creds_json:
-                import tempfile
-                with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-                    f.write(google_creds_json)
-                    temp_creds_path = f.name
-                gc = gspread.service_account(filename=temp_creds_path)
-                os.unlink(temp_creds_path)
-            else:
-                gc = gspread.service_account(filename=GOOGLE_CREDENTIALS_PATH)
-            worksheet = gc.open(SHEET_NAME).get_worksheet(SHEET_WORKSHEET_INDEX)
-            # Set all 'Used' cells to blank
-            records = worksheet.get_all_records()
-            df = pd.DataFrame(records)
-            if 'Used' in df.columns:
-                used_col = df.columns.get_loc('Used') + 1
-                for i in range(2, len(df) + 2):
-                    worksheet.update_cell(i, used_col, '')
-            # Re-fetch quotes
-            quotes_df = self.get_quotes_from_sheet()
-            unused_mask = ~quotes_df.get('Used', '').astype(str).str.lower().isin(['yes', 'true', '1'])
-            unused_quotes = quotes_df[unused_mask]
-            if unused_quotes.empty:
+            if not self.reset_used_column(self.quotes_mirror.count()):
+                return None, None, None
+            self.quotes_mirror.sync(worksheet, force=True, pending=sheet_journal().pending())
+            row = self.quotes_mirror.next_unused(skip=reserved)
+            if row is None:
                 logging.error("No quotes available after reset.")
                 return None, None, None
-        # Get the first unused quote
-        first_unused = unused_quotes.iloc[0]
-        quote = first_unused['Quote']
-        author = first_unused['Author']
-        index = first_unused.name  # This is the DataFrame index, matches row in sheet minus header
-        return quote, author, index
-    
+        return row['quote'], row['author'], row['row_index']
+
+    def stream_unused_quotes(self, limit=None, include_reserved=False):
+        """
+        Generator of (quote_index, quote, author) of the unused quotes in sheet order.
+        Only the Quote, Author, Used and Reserved columns are read, SHEETS_PAGE_SIZE
+        rows per request, and reading stops once `limit` quotes were found.
+        Journaled updates not written to the sheet yet are applied.
+        """
+        worksheet = self.quotes_worksheet()
+        header_row = worksheet.row_values(1)
+        missing_columns = [col for col in ['Quote', 'Author'] if col not in header_row]
+        if missing_columns:
+            raise Exception(f"Missing required columns in Google Sheet: {missing_columns}")
+        names = [name for name in ['Quote', 'Author', 'Used', 'Reserved'] if name in header_row]
+        pending = {(row, column_name): value for row, column_name, value in sheet_journal().pending()}
+        found = scanned = 0
+        for row, values in sheets_gateway().iter_columns(worksheet, [header_row.index(name) + 1 for name in names]):
+            scanned += 1
+            cells = dict(zip(names, values))
+            used = pending.get((row, 'Used'), cells.get('Used', ''))
+            reserved = pending.get((row, 'Reserved'), cells.get('Reserved', ''))
+            if not cells['Quote'] or is_used(used) or (not include_reserved and reservation_active(reserved)):
+                continue
+            active_stage().set(rows=scanned)
+            yield row - 2, cells['Quote'], cells['Author']
+            found += 1
+            if limit and found >= limit:
+                break
+        active_stage().set(rows=scanned)
+
+    @timed('quote_select')
+    def next_streamed_quote(self):
+        """next_mirrored_quote without the mirror: reads the sheet only up to the first unused quote (see stream_unused_quotes)."""
+        try:
+            for quote_index, quote, author in self.stream_unused_quotes(limit=1):
+                return quote, author, quote_index
+            if next(self.stream_unused_quotes(limit=1, include_reserved=True), None):
+                logging.error("All unused quotes are reserved by the render-ahead queue.")
+                return None, None, None
+            worksheet = self.quotes_worksheet()
+            row_count = len(worksheet.col_values(worksheet.row_values(1).index('Quote') + 1)) - 1
+            if row_count <= 0:
+                logging.error("Google Sheet is empty. Please add some quotes.")
+                return None, None, None
+            logging.info("All quotes have been used. Resetting 'Used' column for all quotes.")
+            if not self.reset_used_column(row_count):
+                return None, None, None
+            for quote_index, quote, author in self.stream_unused_quotes(limit=1):
+                return quote, author, quote_index
+            logging.error("No quotes available after reset.")
+        except Exception as e:
+            logging.error(f"Error reading quotes from Google Sheets: {e}")
+        return None, None, None
+
+    def next_unused_quotes(self, count=None):
+        """
+        (quote_index, quote, author) of the next `count` unused quotes (all of them
+        without count), from the quotes mirror or else streamed from the sheet.
+        None if the quotes could not be read.
+        """
+        if self.quotes_mirror:
+            quotes_df = self.get_quotes_from_sheet()
+            if quotes_df is None or quotes_df.empty:
+                return None
+            unused_quotes = self.get_unused_quotes(quotes_df)
+            if count:
+                unused_quotes = unused_quotes.head(count)
+            return [(int(quote_index), row['Quote'], row['Author']) for quote_index, row in unused_quotes.iterrows()]
+        try:
+            with stage('sheet_fetch'):
+                return list(self.stream_unused_quotes(limit=count))
+        except Exception as e:
+            logging.error(f"Error reading quotes from Google Sheets: {e}")
+            return None
+
+    def reset_used_column(self, row_count):
+        """
+        Blank the 'Used' cells of the first row_count quotes in one range update, so an
+        interrupted reset leaves either every row cleared or none.
+        """
+        try:
+            worksheet = self.quotes_worksheet()
+            header_row = worksheet.row_values(1)
+            if 'Used' in header_row:
+                sheets_gateway().write_column(worksheet, header_row.index('Used') + 1, [''] * row_count)
+            logging.info(f"Reset 'Used' for {row_count} quotes")
+            return True
+        except Exception as e:
+            logging.error(f"Error resetting the 'Used' column: {e}")
+            return False
+
     def get_sequential_music(self):
         """Get the next music file from Google Drive, tracking progress in the sheet."""
         try:
@@ -399,8 +476,9 @@ class InstagramAIAgent:
                 logging.info(f"Music index wrapped to 0 due to out of range.")
 
             selected_file = music_files[music_index]
-            temp_path = f"temp_{selected_file['name']}"
-            self.download_drive_file(selected_file['id'], temp_path)
+            temp_path = self.get_music_file(selected_file)
+            if not temp_path:
+                return None
 
             # Move to next music
             next_index = (music_index + 1) % len(music_files)
@@ -427,9 +505,9 @@ class InstagramAIAgent:
 
             # Pick a random music file
             selected_file = random.choice(music_files)
-            temp_path = f"temp_{selected_file['name']}"
-
-            self.download_drive_file(selected_file['id'], temp_path)
+            temp_path = self.get_music_file(selected_file)
+            if not temp_path:
+                return None
             logging.info(f"Selected Random Music: {temp_path}")
 
             return temp_path
@@ -438,7 +516,53 @@ class InstagramAIAgent:
             logging.error(f"Error selecting random music: {e}")
             return None
 
-    
+    def choose_effect_and_music(self, quote, author, music_files):
+        """
+        Effect and Drive music file for a quote: the next effect in the cycle and a
+        random track. A quote rendered before (by a run that then failed to post)
+        gets the same ones again, so the render cache can serve it.
+        """
+        previous = self.render_cache.last_render(quote, author) if self.render_cache else None
+        if previous:
+            for music in music_files:
+                if music['id'] == previous['music_id']:
+                    logging.info(f"Reusing the effect and music of the previous render: {previous['effect']}")
+                    return previous['effect'], music
+        # --- Effect cycling logic ---
+        effect_index = self.progress_data.get('effect_index', 0)
+        effect = AVAILABLE_EFFECTS[effect_index % len(AVAILABLE_EFFECTS)]
+        self.progress_data['effect_index'] = (effect_index + 1) % len(AVAILABLE_EFFECTS)
+        return effect, random.choice(music_files)
+
+    def music_cache_id(self, selected_file):
+        """Identity of a Drive track for the render cache; the checksum catches replaced files."""
+        return f"{selected_file['id']}:{selected_file.get('md5Checksum', '')}"
+
+    def get_music_file(self, selected_file):
+        """
+        Local audio for a Drive music file. With AUDIO_CACHE_ENABLED this is its cached
+        AAC segment (downloaded and prepared only the first time), otherwise a temp_ download.
+        """
+        temp_path = f"temp_{selected_file['name']}"
+        if not AUDIO_CACHE_ENABLED:
+            return self.download_drive_file(selected_file['id'], temp_path)
+        checksum = selected_file.get('md5Checksum')
+        if checksum:
+            segment = cached_segment(checksum, selected_file['id'])
+            if segment:
+                logging.info(f"Using cached audio segment: {segment}")
+                return segment
+        if not self.download_drive_file(selected_file['id'], temp_path):
+            return None
+        try:
+            with stage('audio_prepare'):
+                return prepare_audio_segment(temp_path, selected_file['id'], checksum)
+        except Exception as e:
+            logging.error(f"Error preparing audio segment: {e}")
+            return None
+        finally:
+            os.remove(temp_path)
+
     def create_instagram_caption(self, quote, author):
         """Create Instagram caption with quote, author, and hashtags."""
         caption_parts = []
@@ -523,41 +647,77 @@ class InstagramAIAgent:
         logging.info("Starting Instagram AI Agent...")
         # Check weekly reset (optional, can be removed if not needed)
         # self.check_weekly_reset()
-        # Get quotes
-        quotes_df = self.get_quotes_from_sheet()
-        if quotes_df is None or quotes_df.empty:
-            logging.error("Could not fetch quotes. Exiting.")
-            return False
         # Get next unused quote and music
-        quote, author, quote_index = self.get_sequential_quote(quotes_df)
+        if self.quotes_mirror:
+            quote, author, quote_index = self.next_mirrored_quote()
+        else:
+            quote, author, quote_index = self.next_streamed_quote()
         if not quote or not author or quote_index is None:
             logging.error("Could not get quote. Exiting.")
             return False
-        music_file = self.get_random_music()
-        if not music_file:
-            logging.error("Could not get music file. Exiting.")
+        music_files = self.list_drive_music_files()
+        logging.info(f"Music files found: {music_files}")
+        if not music_files:
+            logging.error("No .mp3 files found in the Drive music folder.")
             return False
         logging.info(f"Selected Quote: '{quote}' by {author}")
-        # --- Effect cycling logic ---
-        from config import AVAILABLE_EFFECTS
-        effect_index = self.progress_data.get('effect_index', 0)
-        effect = AVAILABLE_EFFECTS[effect_index % len(AVAILABLE_EFFECTS)]
-        self.progress_data['effect_index'] = (effect_index + 1) % len(AVAILABLE_EFFECTS)
+        effect, selected_music = self.choose_effect_and_music(quote, author, music_files)
         # --- Video creation with keyframe logic ---
-        logging.info(f"Creating video with effect: {effect}")
-        video_filename = self.video_creator.create_video_with_pil_text_and_blur_keyframe(
-            quote, author, music_file, effect
-        )
+        video_filename = self.render_quote_video(quote, author, effect, selected_music)
         if not video_filename:
             logging.error("Video creation failed.")
             return False
         logging.info(f"Video created successfully: {video_filename}")
         logging.info(f"Quote: '{quote}' by {author}")
+        return self.publish_reel(video_filename, quote, author, quote_index) is not False
+
+    @timed('render')
+    def render_quote_video(self, quote, author, effect, selected_music):
+        """
+        Render (or fetch from the render cache) the video of a quote with the given
+        effect and Drive music file. Returns the video path, or None.
+        """
+        render = active_stage()
+        render.set(effect=effect, cache_hit=False)
+        cache_key = None
+        if self.render_cache:
+            cache_key = render_key(quote, author, effect, self.music_cache_id(selected_music))
+            video_filename = self.render_cache.get(cache_key)
+            if video_filename:
+                logging.info(f"Render cache hit, reusing {video_filename}")
+                render.set(cache_hit=True)
+                return video_filename
+        music_file = self.get_music_file(selected_music)
+        if not music_file:
+            logging.error("Could not get music file.")
+            return None
+        logging.info(f"Creating video with effect: {effect}")
+        video_filename = self.video_creator.create_video_with_pil_text_and_blur_keyframe(
+            quote, author, music_file, effect
+        )
+        # Clean up the downloaded temp music file
+        if music_file.startswith("temp_") and os.path.exists(music_file):
+            os.remove(music_file)
+            logging.info(f"Deleted temporary music file: {music_file}")
+        if video_filename and self.render_cache:
+            video_filename = self.render_cache.put(
+                cache_key, video_filename, quote=quote, author=author, effect=effect,
+                music_id=selected_music['id'])
+        if video_filename:
+            render.bytes = os.path.getsize(video_filename)
+        return video_filename
+
+    def publish_reel(self, video_filename, quote, author, quote_index):
+        """
+        Upload the video to Drive, publish it as a Reel and mark the quote as used.
+        Returns the published media id, None if nothing was published, or False
+        if Instagram failed to process the video.
+        """
         # Upload to Google Drive if enabled
         drive_id = None
         public_url = None
         if UPLOAD_TO_DRIVE:
-            drive_id = self.upload_to_drive(video_filename, video_filename)
+            drive_id = self.upload_to_drive(video_filename, os.path.basename(video_filename))
             if drive_id:
                 logging.info(f"Video uploaded to Google Drive with ID: {drive_id}")
                 public_url = f"https://drive.google.com/uc?id={drive_id}&export=download"
@@ -576,45 +736,301 @@ class InstagramAIAgent:
                 'caption': CAPTION,
                 'access_token': ACCESS_TOKEN
             }
-            media_container_resp = requests.post(media_container_url, data=media_container_payload)
-            print('Media container response:', media_container_resp.json())
-            container_id = media_container_resp.json().get('id')
-            print('Container ID:', container_id)
+            with stage('container_create') as container:
+                media_container_resp = request_scheduler().call(
+                    'graph', requests.post, media_container_url, data=media_container_payload,
+                    idempotent=False)
+                print('Media container response:', media_container_resp.json())
+                container_id = media_container_resp.json().get('id')
+                print('Container ID:', container_id)
+                if not container_id:
+                    container.fail()
             # 2. Poll for status
             status_url = f'https://graph.facebook.com/v19.0/{container_id}?fields=status_code&access_token={ACCESS_TOKEN}'
-            while True:
-                status_resp = requests.get(status_url)
-                status = status_resp.json().get('status_code')
-                print('Status:', status)
-                if status == 'FINISHED':
-                    break
-                elif status == 'ERROR':
-                    print('Error:', status_resp.json())
-                    return False
-                time.sleep(5)
+            with stage('status_poll') as polling:
+                while True:
+                    status_resp = request_scheduler().call('graph', requests.get, status_url)
+                    status = status_resp.json().get('status_code')
+                    print('Status:', status)
+                    if status == 'FINISHED':
+                        break
+                    elif status == 'ERROR':
+                        print('Error:', status_resp.json())
+                        polling.fail(str(status_resp.json()))
+                        return False
+                    polling.retries += 1
+                    time.sleep(5)
             # 3. Publish media
             publish_url = f'https://graph.facebook.com/v19.0/{IG_USER_ID}/media_publish'
             publish_payload = {
                 'creation_id': container_id,
                 'access_token': ACCESS_TOKEN
             }
-            publish_resp = requests.post(publish_url, data=publish_payload)
-            print('Publish response:', publish_resp.json())
+            with stage('media_publish') as publishing:
+                publish_resp = request_scheduler().call(
+                    'graph', requests.post, publish_url, data=publish_payload, idempotent=False)
+                print('Publish response:', publish_resp.json())
+                if not publish_resp.json().get('id'):
+                    publishing.fail()
             # Delete the video from Google Drive after successful Instagram post
             if publish_resp.json().get('id') and drive_id:
-                self.delete_drive_file(drive_id)
+                with stage('drive_delete'):
+                    self.delete_drive_file(drive_id)
                 print(f"[Drive] Deleted video from Google Drive: {drive_id}")
                 logging.info(f"Deleted video from Google Drive: {drive_id}")
             # Mark the used quote in Google Sheets after successful Instagram post
             if publish_resp.json().get('id'):
                 self.mark_quote_as_used(quote_index)
-        # Save effect progress only (no quote/music progress)
-        # Clean up the downloaded temp music file
-        if music_file and music_file.startswith("temp_") and os.path.exists(music_file):
-            os.remove(music_file)
-            logging.info(f"Deleted temporary music file: {music_file}")
+                if self.render_cache:
+                    # Its renders are no longer retries; the next post of this quote renders anew
+                    self.render_cache.mark_published(quote, author)
+            return publish_resp.json().get('id')
+        return None
+
+    def render_ahead(self, count=None):
+        """
+        Fill the render-ahead queue up to `count` reels (RENDER_AHEAD_COUNT by default),
+        one per upcoming posting slot. Each quote is reserved in the sheet before it
+        is rendered, so concurrent producers never render the same one.
+        """
+        count = count or RENDER_AHEAD_COUNT
+        queue = RenderQueue()
+        missing = count - len(queue.entries())
+        if missing <= 0:
+            logging.info(f"Render-ahead queue already holds {count} reels.")
+            return True
+        quotes_df = self.get_quotes_from_sheet()
+        if quotes_df is None or quotes_df.empty:
+            logging.error("Could not fetch quotes. Exiting.")
+            return False
+        music_files = self.list_drive_music_files()
+        if not music_files:
+            logging.error("No .mp3 files found in the Drive music folder.")
+            return False
+        slots = posting_slots(datetime.now(), missing, taken=queue.slots())
+        token = reservation_token()
+        queued = 0
+        for quote_index, row in self.get_unused_quotes(quotes_df).iterrows():
+            if queued == missing:
+                break
+            if not self.reserve_quote(quote_index, token):
+                logging.info(f"Quote {quote_index} is reserved by another producer, skipping.")
+                continue
+            quote, author = row['Quote'], row['Author']
+            effect, selected_music = self.choose_effect_and_music(quote, author, music_files)
+            video_filename = self.render_quote_video(quote, author, effect, selected_music)
+            if not video_filename:
+                logging.error(f"Rendering quote {quote_index} failed, releasing it.")
+                self.release_quote(quote_index)
+                continue
+            entry = queue.add(video_filename, slots[queued], quote=quote, author=author,
+                              quote_index=int(quote_index), effect=effect, music_id=selected_music['id'],
+                              reservation=token)
+            logging.info(f"Queued '{quote}' by {author} for {entry['slot']}")
+            queued += 1
+        self.save_progress()
+        print(f"[Queue] Rendered {queued} of {missing} reels ahead; {len(queue.entries())} queued.")
+        return queued == missing
+
+    def publish_from_queue(self, force=False):
+        """
+        Publish the queued reel whose posting slot has come (the earliest queued one
+        with force). The entry stays queued if publishing fails, for the next run.
+        """
+        queue = RenderQueue()
+        entries = queue.entries()
+        entry = entries[0] if force and entries else queue.next_due()
+        if entry is None:
+            logging.info("No queued reel is due.")
+            return True
+        quotes_df = self.get_quotes_from_sheet()
+        if quotes_df is None:
+            logging.error("Could not fetch quotes. Exiting.")
+            return False
+        # Rows may have moved since the reel was queued
+        matches = quotes_df[(quotes_df['Quote'] == entry['quote']) & (quotes_df['Author'] == entry['author'])]
+        if matches.empty:
+            logging.error(f"Queued quote '{entry['quote']}' is no longer in the sheet, dropping it.")
+            queue.remove(entry)
+            return False
+        quote_index = entry['quote_index'] if entry['quote_index'] in matches.index else matches.index[0]
+        logging.info(f"Publishing queued reel for slot {entry['slot']}: '{entry['quote']}' by {entry['author']}")
+        if not self.publish_reel(queue.video_path(entry), entry['quote'], entry['author'], quote_index):
+            logging.error("Publishing the queued reel failed; it stays queued.")
+            return False
+        self.release_quote(quote_index)
+        queue.remove(entry)
         return True
 
+    def flush_sheet_journal(self):
+        """
+        Write the journaled sheet updates, this run's and any a failed earlier run
+        left behind, in one batch request. Returns False if they stay journaled.
+        """
+        journal = sheet_journal()
+        if not journal.pending():
+            return True
+        try:
+            with stage('sheet_flush') as flushing:
+                worksheet = self.quotes_worksheet()
+                # The mirror already holds these updates; keep it current unless someone else edited the sheet
+                mirror_current = self.quotes_mirror and self.quotes_mirror.is_current(worksheet)
+                flushing.set(cells=journal.flush(worksheet, sheets_gateway()))
+                if mirror_current:
+                    self.quotes_mirror.mark_current(worksheet)
+            print(f"[Sheets] Wrote {flushing.fields['cells']} journaled cell updates")
+            return True
+        except Exception as e:
+            logging.error(f"Error writing journaled sheet updates, keeping them for the next run: {e}")
+            return False
+
+    def quotes_worksheet(self):
+        """The quotes worksheet, through the run's shared SheetsGateway."""
+        return sheets_gateway().worksheet(SHEET_NAME, SHEET_WORKSHEET_INDEX)
+
+    def reserved_column(self, worksheet):
+        """1-based index of the 'Reserved' column, added after the last header if missing."""
+        header_row = worksheet.row_values(1)
+        if 'Reserved' in header_row:
+            return header_row.index('Reserved') + 1
+        worksheet.update_cell(1, len(header_row) + 1, 'Reserved')
+        logging.info("Added 'Reserved' column to Google Sheet")
+        return len(header_row) + 1
+
+    def reserve_quote(self, quote_index, token):
+        """
+        Reserve a quote for the render-ahead queue by writing token to its 'Reserved'
+        cell. The cell is read back after RESERVATION_SETTLE_SECONDS: a producer that
+        wrote in the meantime has overwritten it, and only the last writer keeps the quote.
+        That holds only while every producer's write lands within the settle window of
+        its check, so a write held back longer (by the scheduler's pacing or retries)
+        gives the quote up.
+        """
+        try:
+            worksheet = self.quotes_worksheet()
+            col = self.reserved_column(worksheet)
+            row = quote_index + 2  # +2 because of 1-indexing and header
+            started = time.monotonic()
+            if reservation_active(worksheet.cell(row, col).value):
+                return False
+            worksheet.update_cell(row, col, token)
+            if time.monotonic() - started >= RESERVATION_SETTLE_SECONDS:
+                # A producer that already read its own token back may be keeping the quote too
+                logging.warning(f"Reserving quote {quote_index} took longer than the settle window, giving it up.")
+                if worksheet.cell(row, col).value == token:
+                    worksheet.update_cell(row, col, '')
+                return False
+            time.sleep(RESERVATION_SETTLE_SECONDS)
+            return worksheet.cell(row, col).value == token
+        except Exception as e:
+            logging.error(f"Error reserving quote: {e}")
+            return False
+
+    def release_quote(self, quote_index):
+        """Clear a quote's 'Reserved' cell (journaled, see flush_sheet_journal)."""
+        try:
+            sheet_journal().record(quote_index + 2, 'Reserved', '')
+            if self.quotes_mirror:
+                self.quotes_mirror.set_cell(quote_index, 'Reserved', '')
+            return True
+        except Exception as e:
+            logging.error(f"Error releasing quote: {e}")
+            return False
+
+    def create_videos_batch(self, count, workers=None):
+        """
+        Render the next `count` unused quotes in one warm worker pool, without posting.
+        The sheet is read once and each music track is fetched once for the whole
+        batch. Videos and a manifest.json go to BATCH_OUTPUT_DIR.
+        """
+        from batch_render import render_batch
+        logging.info(f"Starting batch render of {count} videos...")
+        unused_quotes = self.next_unused_quotes(count)
+        if unused_quotes is None:
+            logging.error("Could not fetch quotes. Exiting.")
+            return False
+        if not unused_quotes:
+            logging.error("No unused quotes to render.")
+            return False
+        music_files = self.list_drive_music_files()
+        if not music_files:
+            logging.error("No .mp3 files found in the Drive music folder.")
+            return False
+        os.makedirs(BATCH_OUTPUT_DIR, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        downloaded = {}
+        items = []
+        for quote_index, quote, author in unused_quotes:
+            selected_file = random.choice(music_files)
+            if selected_file['id'] not in downloaded:
+                downloaded[selected_file['id']] = self.get_music_file(selected_file)
+            music_file = downloaded[selected_file['id']]
+            if not music_file:
+                logging.error(f"Skipping quote {quote_index}: music download failed.")
+                continue
+            effect_index = self.progress_data.get('effect_index', 0)
+            effect = AVAILABLE_EFFECTS[effect_index % len(AVAILABLE_EFFECTS)]
+            self.progress_data['effect_index'] = (effect_index + 1) % len(AVAILABLE_EFFECTS)
+            items.append({
+                'quote_index': int(quote_index),
+                'quote': quote,
+                'author': author,
+                'effect': effect,
+                'music_file': music_file,
+                'music_id': selected_file['id'],
+                'filename': os.path.join(BATCH_OUTPUT_DIR, f"instagram_video_{timestamp}_{quote_index}.mp4"),
+            })
+        try:
+            results, summary = render_batch(items, workers)
+        finally:
+            for music_file in downloaded.values():
+                if music_file and music_file.startswith("temp_") and os.path.exists(music_file):
+                    os.remove(music_file)
+        self.save_progress()
+        manifest_path = os.path.join(BATCH_OUTPUT_DIR, f"manifest_{timestamp}.json")
+        with open(manifest_path, 'w') as f:
+            json.dump({'summary': summary, 'videos': results}, f, indent=2)
+        print(f"[Batch] {summary['videos']} videos rendered ({summary['failed']} failed) in "
+              f"{summary['wall_seconds']}s - {summary['videos_per_minute']} videos/min. Manifest: {manifest_path}")
+        return summary['failed'] == 0
+
+    def preview_quotes(self, count=None, kind='png'):
+        """
+        Render draft previews (see preview.py) of the next `count` unused quotes, or
+        all of them, to PREVIEW_DIR with the effect each would get next. Nothing is
+        posted or marked; a manifest lists each preview and its layout warnings.
+        """
+        from preview import render_preview
+        unused_quotes = self.next_unused_quotes(count)
+        if unused_quotes is None:
+            logging.error("Could not fetch quotes. Exiting.")
+            return False
+        os.makedirs(PREVIEW_DIR, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        effect_index = self.progress_data.get('effect_index', 0)
+        results = []
+        start = time.perf_counter()
+        for i, (quote_index, quote, author) in enumerate(unused_quotes):
+            effect = AVAILABLE_EFFECTS[(effect_index + i) % len(AVAILABLE_EFFECTS)]
+            filename = os.path.join(PREVIEW_DIR, f"preview_{quote_index}.{'mp4' if kind == 'video' else 'png'}")
+            try:
+                result = render_preview(quote, author, effect, filename, kind)
+            except Exception as e:
+                logging.error(f"Error previewing quote {quote_index}: {e}")
+                result = {'quote': quote, 'author': author, 'effect': effect,
+                          'file': None, 'warnings': [f"preview failed: {e}"]}
+            result['quote_index'] = int(quote_index)
+            results.append(result)
+            for warning in result['warnings']:
+                print(f"[Preview] Quote {quote_index}: {warning}")
+        manifest_path = os.path.join(PREVIEW_DIR, f"manifest_{timestamp}.json")
+        with open(manifest_path, 'w') as f:
+            json.dump(results, f, indent=2)
+        flagged = sum(1 for result in results if result['warnings'])
+        print(f"[Preview] {len(results)} previews in {time.perf_counter() - start:.1f}s, "
+              f"{flagged} with warnings. Manifest: {manifest_path}")
+        return flagged == 0
+
     def post_video_direct_url(self, public_url, caption):
         # Step 1: Create media container
         media_url = f"https://graph.facebook.com/v18.0/{self.ig_user_id}/media"
@@ -624,7 +1040,7 @@ class InstagramAIAgent:
             "caption": caption,
             "access_token": self.access_token
         }
-        resp = requests.post(media_url, data=params)
+        resp = request_scheduler().call('graph', requests.post, media_url, data=params, idempotent=False)
         creation_id = resp.json().get("id")
         if not creation_id:
             logging.error(f"Failed to create media container: {resp.json()}")
@@ -633,7 +1049,7 @@ class InstagramAIAgent:
         # Step 2: Poll for status
         for i in range(12):
             status_url = f"https://graph.facebook.com/v18.0/{creation_id}?fields=status_code&access_token={self.access_token}"
-            status_resp = requests.get(status_url)
+            status_resp = request_scheduler().call('graph', requests.get, status_url)
             status_code = status_resp.json().get("status_code")
             if status_code == "FINISHED":
                 break
@@ -647,23 +1063,26 @@ class InstagramAIAgent:
                 "creation_id": creation_id,
                 "access_token": self.access_token
             }
-            publish_resp = requests.post(publish_url, data=params)
+            publish_resp = request_scheduler().call('graph', requests.post, publish_url, data=params, idempotent=False)
             logging.info(f"Publish response: {publish_resp.json()}")
             return True
         else:
             logging.error("Media was not ready after waiting.")
             return False
 
+    @timed('music_list')
     def list_drive_music_files(self):
         """List all .mp3 files in the Google Drive music folder."""
         try:
             query = f"'{DRIVE_MUSIC_FOLDER_ID}' in parents and mimeType='audio/mpeg' and trashed=false"
-            results = self.drive_service.files().list(q=query, fields="files(id, name)").execute()
+            results = request_scheduler().execute(
+                'drive', self.drive_service.files().list(q=query, fields="files(id, name, md5Checksum)"))
             return results.get('files', [])
         except Exception as e:
             logging.error(f"Error listing music files in Drive: {e}")
             return []
 
+    @timed('music_download')
     def download_drive_file(self, file_id, destination_path):
         """Download a file from Google Drive to a local path."""
         try:
@@ -672,50 +1091,25 @@ class InstagramAIAgent:
                 downloader = MediaIoBaseDownload(f, request)
                 done = False
                 while not done:
-                    status, done = downloader.next_chunk()
+                    status, done = request_scheduler().call('drive', downloader.next_chunk)
+            active_stage().bytes = os.path.getsize(destination_path)
             logging.info(f"Downloaded file {file_id} to {destination_path}")
             return destination_path
         except Exception as e:
             logging.error(f"Error downloading file from Drive: {e}")
             return None
 
+    @timed('sheet_update')
     def mark_quote_as_used(self, quote_index):
-        """Mark a quote as used by updating the 'Used' column in the correct position."""
+        """
+        Mark a quote as used in the 'Used' column (added if missing). The update is
+        journaled, so it survives a Sheets failure, and written by flush_sheet_journal.
+        """
         try:
-            import tempfile
-            import os
-            import pandas as pd
-            import gspread
-            import logging
-
-            google_creds_json = os.getenv('GOOGLE_APPLICATION_CREDENTIALS_JSON')
-            if not google_creds_json:
-                raise Exception("GOOGLE_APPLICATION_CREDENTIALS_JSON environment variable not set.")
-
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-                f.write(google_creds_json)
-                temp_creds_path = f.name
-
-            gc = gspread.service_account(filename=temp_creds_path)
-            os.unlink(temp_creds_path)  # Clean up temp file
-
-            worksheet = gc.open(SHEET_NAME).get_worksheet(SHEET_WORKSHEET_INDEX)
-            records = worksheet.get_all_records()
-            df = pd.DataFrame(records)
-
-            header_row = worksheet.row_values(1)
-
-            if 'Used' not in header_row:
-                # Add 'Used' to the first empty column
-                worksheet.update_cell(1, len(header_row) + 1, 'Used')
-                used_col_index = len(header_row) + 1
-                logging.info("Added 'Used' column to Google Sheet")
-            else:
-                # Find the actual column index of 'Used'
-                used_col_index = header_row.index('Used') + 1  # 1-indexed
-
             row_to_update = quote_index + 2  # +2 because of 1-indexing and header
-            worksheet.update_cell(row_to_update, used_col_index, 'yes')
+            sheet_journal().record(row_to_update, 'Used', 'yes')
+            if self.quotes_mirror:
+                self.quotes_mirror.set_cell(quote_index, 'Used', 'yes')
             logging.info(f"Marked quote at index {quote_index} (row {row_to_update}) as used")
             print(f"[Sheets] Marked quote in row {row_to_update} as used")
             return True
@@ -733,7 +1127,7 @@ class InstagramAIAgent:
             logging.warning("Google Drive service not initialized. Cannot delete file.")
             return
         try:
-            self.drive_service.files().delete(fileId=file_id, supportsAllDrives=True).execute()
+            request_scheduler().execute('drive', self.drive_service.files().delete(fileId=file_id, supportsAllDrives=True))
             logging.info(f"Deleted file from Google Drive: {file_id}")
         except Exception as e:
             if "insufficientFilePermissions" in str(e):
@@ -745,17 +1139,10 @@ class InstagramAIAgent:
     def delete_quote_from_sheet(self, quote_index):
         """Delete the used quote from Google Sheets to prevent reuse."""
         try:
-            # Always get credentials from environment variable (GitHub Actions)
-            google_creds_json = os.getenv('GOOGLE_APPLICATION_CREDENTIALS_JSON')
-            if not google_creds_json:
-                raise Exception("GOOGLE_APPLICATION_CREDENTIALS_JSON environment variable not set.")
-            import tempfile
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-                f.write(google_creds_json)
-                temp_creds_path = f.name
-            gc = gspread.service_account(filename=temp_creds_path)
-            os.unlink(temp_creds_path)  # Clean up temp file
-            worksheet = gc.open(SHEET_NAME).get_worksheet(SHEET_WORKSHEET_INDEX)
+            # Journaled updates address rows by number, so they must land before rows move
+            if not self.flush_sheet_journal():
+                raise Exception("journaled sheet updates could not be written")
+            worksheet = self.quotes_worksheet()
             # Delete the row (add 2 because sheets are 1-indexed and we have a header row)
             row_to_delete = quote_index + 2
             worksheet.delete_rows(row_to_delete)
@@ -771,14 +1158,45 @@ class InstagramAIAgent:
 
 def main():
     """Main execution function."""
+    parser = argparse.ArgumentParser(description="Instagram AI Agent")
+    parser.add_argument('--batch', type=int, metavar='N',
+                        help="Render the next N unused quotes in one worker pool, without posting")
+    parser.add_argument('--preview', nargs='?', const='png', choices=['png', 'video'],
+                        help="Render draft previews (PNG keyframes or small MP4s) of the unused quotes "
+                             "(the next N with --batch) to PREVIEW_DIR instead of videos")
+    parser.add_argument('--workers', type=int, help="Worker processes for --batch (default: BATCH_WORKERS)")
+    parser.add_argument('--render-ahead', type=int, nargs='?', const=RENDER_AHEAD_COUNT, metavar='K',
+                        help="Fill the render-ahead queue up to K reels (default: RENDER_AHEAD_COUNT)")
+    parser.add_argument('--publish-next', action='store_true',
+                        help="Publish the queued reel whose posting slot has come")
+    parser.add_argument('--force', action='store_true', help="With --publish-next, publish the earliest reel now")
+    args = parser.parse_args()
+
     agent = InstagramAIAgent()
-    
-    # First, let's see what sheets are available
-    logging.info("Checking available Google Sheets...")
-    agent.list_available_sheets()
-    
-    # Then try to create the video
-    return agent.create_video()
+    if args.preview:
+        command, run = 'preview', lambda: agent.preview_quotes(args.batch, args.preview)
+    elif args.batch:
+        command, run = 'batch', lambda: agent.create_videos_batch(args.batch, args.workers)
+    elif args.render_ahead:
+        command, run = 'render_ahead', lambda: agent.render_ahead(args.render_ahead)
+    elif args.publish_next:
+        command, run = 'publish_next', lambda: agent.publish_from_queue(args.force)
+    else:
+        # First, let's see what sheets are available
+        logging.info("Checking available Google Sheets...")
+        agent.list_available_sheets()
+        # Then try to create the video
+        command, run = 'create_video', agent.create_video
+    start_run(command)
+    success = False
+    try:
+        # Replay sheet updates a failed earlier run could not write
+        agent.flush_sheet_journal()
+        success = run()
+    finally:
+        agent.flush_sheet_journal()
+        finish_run(success)
+    return success
 
 if __name__ == "__main__":
     main() 
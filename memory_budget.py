@@ -0,0 +1,185 @@
+"""
+Memory accounting and budget
+Samples RSS (and, with MEMORY_TRACEMALLOC, the top Python allocators) around
+every metrics stage, and picks a render strategy that fits MEMORY_BUDGET_MB:
+fewer parallel workers, then streaming frames through the pipe renderer, then
+a single-threaded encoder. Estimates are per-process peaks measured on
+1080x1920 renders, scaled by the frame size
+"""
+
+import os
+import sys
+import logging
+import tracemalloc
+from config import *
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Measured peaks (MB) at 1080x1920, diamond_blur, ENCODING_PROFILE 'balanced'
+PYTHON_BASE_MB = 70  # Interpreter, numpy, PIL and MoviePy imported
+SINGLE_RENDER_MB = 280  # MoviePy compositing (float frames, blur level caches)
+PIPE_RENDER_MB = 110  # PipeRenderer canvas and layer buffers
+ENCODER_MB = 220  # x264 in the ffmpeg child, one thread
+ENCODER_THREAD_MB = 32  # Each further x264 thread
+REFERENCE_PIXELS = 1080 * 1920
+
+# Traced-memory state of the stages being timed, innermost last
+stage_memory_stack = []
+# tracemalloc's own bookkeeping is left out of the top allocators
+TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+]
+
+
+def current_rss_mb():
+    """Resident memory of this process now (the peak so far where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+
+def maxrss_mb(who):
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(who).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return maxrss / 1024 / 1024 if sys.platform == 'darwin' else maxrss / 1024
+
+
+def peak_rss_mb():
+    """High-water mark of this process's resident memory."""
+    return maxrss_mb(resource.RUSAGE_SELF) if resource else None
+
+
+def children_peak_rss_mb():
+    """Largest peak of the finished child processes (ffmpeg, render workers)."""
+    return maxrss_mb(resource.RUSAGE_CHILDREN) if resource else None
+
+
+def start_tracing():
+    if MEMORY_TRACEMALLOC and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def begin_stage_memory():
+    """Memory state at the start of a stage, for end_stage_memory."""
+    state = {'peak_rss_mb': peak_rss_mb(), 'traced_peak': 0, 'snapshot': None}
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+        state['snapshot'] = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS)
+    stage_memory_stack.append(state)
+    return state
+
+
+def end_stage_memory(state):
+    """Memory fields of a finished stage: RSS now, peaks, and traced allocations."""
+    stage_memory_stack.remove(state)
+    peak = peak_rss_mb()
+    fields = {
+        'rss_mb': round(current_rss_mb() or 0, 1),
+        'peak_rss_mb': round(peak or 0, 1),
+        # How far this stage raised the process's high-water mark
+        'peak_rss_growth_mb': round((peak or 0) - (state['peak_rss_mb'] or 0), 1),
+        'children_peak_rss_mb': round(children_peak_rss_mb() or 0, 1),
+    }
+    if state['snapshot'] is not None and tracemalloc.is_tracing():
+        # Nested stages reset the traced peak, so they report theirs to the enclosing stage
+        traced_peak = max(tracemalloc.get_traced_memory()[1], state['traced_peak'])
+        if stage_memory_stack:
+            parent = stage_memory_stack[-1]
+            parent['traced_peak'] = max(parent['traced_peak'], traced_peak)
+        fields['traced_peak_mb'] = round(traced_peak / 1024 / 1024, 1)
+        growth = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS).compare_to(state['snapshot'], 'lineno')
+        fields['top_allocators'] = [
+            f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} {stat.size_diff / 1024 / 1024:+.1f} MB"
+            for stat in growth[:MEMORY_TOP_ALLOCATORS]
+        ]
+    return fields
+
+
+def default_encoder_threads():
+    profile_threads = ENCODING_PROFILES.get(ENCODING_PROFILE, {}).get('threads')
+    return profile_threads or os.cpu_count() or 1
+
+
+def estimate_render_mb(plan):
+    """Estimated peak memory (MB) of a render plan, this process and its children together."""
+    scale = VIDEO_WIDTH * VIDEO_HEIGHT / REFERENCE_PIXELS
+    render_mode = plan['render_mode']
+    if render_mode == 'parallel':
+        workers = plan['workers']
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        encoder = (ENCODER_MB + ENCODER_THREAD_MB * (threads - 1)) * scale
+        return PYTHON_BASE_MB + workers * (PYTHON_BASE_MB + SINGLE_RENDER_MB * scale + encoder)
+    threads = plan['encoder_threads'] or default_encoder_threads()
+    encoder = (ENCODER_MB + ENCODER_THREAD_MB * (threads - 1)) * scale
+    frames = PIPE_RENDER_MB if render_mode == 'pipe' else SINGLE_RENDER_MB
+    return PYTHON_BASE_MB + frames * scale + encoder
+
+
+def render_plans(render_mode, workers=None):
+    """The requested render plan followed by lower-memory fallbacks, largest first."""
+    workers = max(1, workers or RENDER_WORKERS)
+    plans = [{'render_mode': render_mode, 'workers': workers, 'encoder_threads': None}]
+    if render_mode == 'parallel':
+        workers //= 2
+        while workers >= 2:
+            plans.append({'render_mode': 'parallel', 'workers': workers, 'encoder_threads': None})
+            workers //= 2
+        plans.append({'render_mode': 'single', 'workers': 1, 'encoder_threads': None})
+    if render_mode != 'pipe':
+        # Frames are composited in one reused buffer and streamed to ffmpeg
+        plans.append({'render_mode': 'pipe', 'workers': 1, 'encoder_threads': None})
+    if default_encoder_threads() > 1:
+        plans.append({'render_mode': 'pipe', 'workers': 1, 'encoder_threads': 1})
+    return plans
+
+
+def fitting_plans(render_mode, workers=None, budget_mb=None):
+    """
+    render_plans from the first one that fits the budget (MEMORY_BUDGET_MB by
+    default), for the caller to try in order. Without a budget all are returned;
+    if none fits, only the smallest.
+    """
+    plans = render_plans(render_mode, workers)
+    budget_mb = MEMORY_BUDGET_MB if budget_mb is None else budget_mb
+    if not budget_mb:
+        return plans
+    # What this process already holds beyond a fresh interpreter counts against the budget
+    available = budget_mb - max(0, (current_rss_mb() or 0) - PYTHON_BASE_MB)
+    for i, plan in enumerate(plans):
+        if estimate_render_mb(plan) <= available:
+            if i:
+                logging.warning(f"Memory budget {budget_mb} MB: rendering with {describe_plan(plan)} "
+                                f"instead of {describe_plan(plans[0])}")
+            return plans[i:]
+    logging.warning(f"Memory budget {budget_mb} MB is below every render plan's estimate; "
+                    f"using {describe_plan(plans[-1])} (~{estimate_render_mb(plans[-1]):.0f} MB)")
+    return plans[-1:]
+
+
+def describe_plan(plan):
+    description = plan['render_mode']
+    if plan['render_mode'] == 'parallel':
+        description += f" with {plan['workers']} workers"
+    if plan['encoder_threads']:
+        description += f", {plan['encoder_threads']} encoder thread(s)"
+    return description
+
+
+def batch_workers_within_budget(workers, render_mode, budget_mb=None):
+    """Worker count for a batch whose workers each render one video in render_mode."""
+    budget_mb = MEMORY_BUDGET_MB if budget_mb is None else budget_mb
+    if not budget_mb:
+        return workers
+    per_video = estimate_render_mb({'render_mode': render_mode, 'workers': 1, 'encoder_threads': None})
+    fitting = max(1, min(workers, int(budget_mb // per_video)))
+    if fitting < workers:
+        logging.warning(f"Memory budget {budget_mb} MB: batch uses {fitting} workers instead of {workers}")
+    return fitting
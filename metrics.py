@@ -0,0 +1,234 @@
+"""
+Pipeline metrics
+Records the duration, bytes moved and retry count of every stage of a run
+(sheet fetch, music download, render, encode, Drive upload, Graph API calls,
+sheet update). Finished runs are appended to METRICS_FILE as JSON lines and,
+with METRICS_PROMETHEUS_FILE set, written in the Prometheus text format
+
+    start_run('create_video')
+    with stage('drive_upload') as upload:
+        upload.bytes = os.path.getsize(video_path)
+        ...
+    finish_run(success)
+
+Whole methods are timed with the @timed(name) decorator. Stages outside a run
+(in worker processes or the benchmarks) are not recorded. Each stage also
+records the RSS and peak RSS memory_budget measures around it
+"""
+
+import os
+import json
+import time
+import uuid
+import functools
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from config import *
+from memory_budget import begin_stage_memory, end_stage_memory, start_tracing
+
+PROMETHEUS_PREFIX = 'instagram_agent'
+
+current_run = None
+stage_stack = []  # Stages being timed, innermost last
+
+
+class StageRecord:
+    """One timed stage. Code inside the stage sets bytes, retries, status and extra fields."""
+
+    def __init__(self, name, **fields):
+        self.name = name
+        self.started = time.time()
+        self.seconds = None
+        self.bytes = 0
+        self.retries = 0
+        self.throttled = 0  # Requests delayed by a quota bucket or refused by the API
+        self.throttle_seconds = 0.0
+        self.status = 'ok'
+        self.fields = fields
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def fail(self, reason=None):
+        self.status = 'failed'
+        if reason:
+            self.fields['reason'] = reason
+
+    def as_dict(self):
+        return dict(self.fields, stage=self.name, seconds=round(self.seconds or 0, 3),
+                    bytes=self.bytes, retries=self.retries, throttled=self.throttled,
+                    throttle_seconds=round(self.throttle_seconds, 3), status=self.status,
+                    started=datetime.fromtimestamp(self.started).isoformat(timespec='milliseconds'))
+
+
+class RunMetrics:
+    """The stages of one run of the agent (one command: create_video, --batch, ...)."""
+
+    def __init__(self, command):
+        self.command = command
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started = time.time()
+        self.stages = []
+
+    def record(self, record):
+        self.stages.append(record)
+
+    def totals(self):
+        """Seconds, bytes, retries and throttling summed per stage name."""
+        totals = {}
+        for record in self.stages:
+            total = totals.setdefault(record.name, {'seconds': 0.0, 'bytes': 0, 'retries': 0, 'throttled': 0,
+                                                    'throttle_seconds': 0.0, 'count': 0, 'peak_rss_mb': 0})
+            total['seconds'] += record.seconds or 0
+            total['peak_rss_mb'] = max(total['peak_rss_mb'], record.fields.get('peak_rss_mb', 0))
+            total['bytes'] += record.bytes
+            total['retries'] += record.retries
+            total['throttled'] += record.throttled
+            total['throttle_seconds'] += record.throttle_seconds
+            total['count'] += 1
+        for total in totals.values():
+            total['seconds'] = round(total['seconds'], 3)
+            total['throttle_seconds'] = round(total['throttle_seconds'], 3)
+        return totals
+
+    def write_jsonl(self, path, status, seconds):
+        with open(path, 'a') as f:
+            for record in self.stages:
+                f.write(json.dumps(dict(record.as_dict(), run_id=self.run_id, command=self.command),
+                                   default=str) + '\n')
+            f.write(json.dumps({
+                'run_id': self.run_id,
+                'command': self.command,
+                'stage': 'run',
+                'status': status,
+                'seconds': round(seconds, 3),
+                'started': datetime.fromtimestamp(self.started).isoformat(timespec='milliseconds'),
+                'totals': self.totals(),
+            }, default=str) + '\n')
+
+    def write_prometheus(self, path, status, seconds):
+        """Gauges of this run, replaced atomically so a scraper never reads a partial file."""
+        labels = f'command="{self.command}"'
+        lines = [
+            f"# HELP {PROMETHEUS_PREFIX}_stage_duration_seconds Time spent in each pipeline stage during the last run.",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_duration_seconds gauge",
+        ]
+        totals = self.totals()
+        for name, total in totals.items():
+            lines.append(f'{PROMETHEUS_PREFIX}_stage_duration_seconds{{{labels},stage="{name}"}} {total["seconds"]:.3f}')
+        lines += [
+            f"# HELP {PROMETHEUS_PREFIX}_stage_bytes Bytes moved by each pipeline stage during the last run.",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_bytes gauge",
+        ]
+        for name, total in totals.items():
+            lines.append(f'{PROMETHEUS_PREFIX}_stage_bytes{{{labels},stage="{name}"}} {total["bytes"]}')
+        lines += [
+            f"# HELP {PROMETHEUS_PREFIX}_stage_retries Retries of each pipeline stage during the last run.",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_retries gauge",
+        ]
+        for name, total in totals.items():
+            lines.append(f'{PROMETHEUS_PREFIX}_stage_retries{{{labels},stage="{name}"}} {total["retries"]}')
+        lines += [
+            f"# HELP {PROMETHEUS_PREFIX}_stage_throttled Requests of each pipeline stage delayed by API quotas during the last run.",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_throttled gauge",
+        ]
+        for name, total in totals.items():
+            lines.append(f'{PROMETHEUS_PREFIX}_stage_throttled{{{labels},stage="{name}"}} {total["throttled"]}')
+        lines += [
+            f"# HELP {PROMETHEUS_PREFIX}_stage_throttle_seconds Time each pipeline stage waited for API quotas during the last run.",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_throttle_seconds gauge",
+        ]
+        for name, total in totals.items():
+            lines.append(f'{PROMETHEUS_PREFIX}_stage_throttle_seconds{{{labels},stage="{name}"}} '
+                         f'{total["throttle_seconds"]:.3f}')
+        lines += [
+            f"# HELP {PROMETHEUS_PREFIX}_stage_peak_rss_bytes Peak resident memory of the agent at the end of each stage.",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_peak_rss_bytes gauge",
+        ]
+        for name, total in totals.items():
+            lines.append(f'{PROMETHEUS_PREFIX}_stage_peak_rss_bytes{{{labels},stage="{name}"}} '
+                         f'{int(total["peak_rss_mb"] * 1024 * 1024)}')
+        lines += [
+            f"# HELP {PROMETHEUS_PREFIX}_run_duration_seconds Duration of the last run.",
+            f"# TYPE {PROMETHEUS_PREFIX}_run_duration_seconds gauge",
+            f"{PROMETHEUS_PREFIX}_run_duration_seconds{{{labels}}} {seconds:.3f}",
+            f"# HELP {PROMETHEUS_PREFIX}_run_success Whether the last run succeeded.",
+            f"# TYPE {PROMETHEUS_PREFIX}_run_success gauge",
+            f"{PROMETHEUS_PREFIX}_run_success{{{labels}}} {1 if status == 'ok' else 0}",
+            f"# HELP {PROMETHEUS_PREFIX}_run_timestamp_seconds When the last run finished.",
+            f"# TYPE {PROMETHEUS_PREFIX}_run_timestamp_seconds gauge",
+            f"{PROMETHEUS_PREFIX}_run_timestamp_seconds{{{labels}}} {time.time():.0f}",
+        ]
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(temp_path, path)
+
+
+def start_run(command):
+    """Start recording the stages of a run. Returns it (None with METRICS_ENABLED off)."""
+    global current_run
+    current_run = RunMetrics(command) if METRICS_ENABLED else None
+    if current_run is not None:
+        start_tracing()
+    return current_run
+
+
+@contextmanager
+def stage(name, **fields):
+    """Time the block as stage `name`. An exception marks it failed and propagates."""
+    record = StageRecord(name, **fields)
+    stage_stack.append(record)
+    memory = begin_stage_memory() if current_run is not None else None
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record.fail(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        record.seconds = time.perf_counter() - start
+        stage_stack.remove(record)
+        if current_run is not None:
+            if memory is not None:
+                record.set(**end_stage_memory(memory))
+            current_run.record(record)
+
+
+def timed(name):
+    """Decorator timing every call as stage `name`; a None or False result marks it failed."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name) as record:
+                result = function(*args, **kwargs)
+                if result is None or result is False:
+                    record.fail()
+                return result
+        return wrapper
+    return decorator
+
+
+def active_stage():
+    """The innermost stage being timed, so a function can add its bytes and retries to it."""
+    return stage_stack[-1] if stage_stack else StageRecord(None)
+
+
+def finish_run(success):
+    """Write the current run to METRICS_FILE (and METRICS_PROMETHEUS_FILE) and stop recording."""
+    global current_run
+    run, current_run = current_run, None
+    if run is None:
+        return None
+    status = 'ok' if success else 'failed'
+    seconds = time.time() - run.started
+    try:
+        run.write_jsonl(METRICS_FILE, status, seconds)
+        if METRICS_PROMETHEUS_FILE:
+            run.write_prometheus(METRICS_PROMETHEUS_FILE, status, seconds)
+    except Exception as e:
+        logging.error(f"Error writing metrics: {e}")
+    summary = ', '.join(f"{name} {total['seconds']:.1f}s" for name, total in run.totals().items())
+    logging.info(f"Run {run.run_id} {status} in {seconds:.1f}s: {summary}")
+    return run
@@ -0,0 +1,84 @@
+"""
+Parallel rendering for VideoCreator
+Splits the timeline into segments, renders and encodes them in a process pool,
+then joins them without re-encoding and muxes the audio once
+"""
+
+import os
+import shutil
+import logging
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from moviepy.config import get_setting
+from config import *
+from video_creator import VideoCreator, frame_count
+from audio_cache import is_audio_segment
+from encoding import get_encoding_profile, moviepy_write_kwargs
+
+
+def split_frames(total_frames, segments):
+    """Split [0, total_frames) into contiguous (start, end) frame ranges."""
+    segments = max(1, min(segments, total_frames))
+    bounds = [round(i * total_frames / segments) for i in range(segments + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def render_segment(quote_text, author_text, effect, start_frame, end_frame, segment_path, threads):
+    """Render frames [start_frame, end_frame) of the video into a silent MP4 segment."""
+    video = VideoCreator().build_video(quote_text, author_text, effect)
+    # Ending half a frame early makes MoviePy emit exactly end_frame - start_frame frames
+    segment = video.subclip(start_frame / VIDEO_FPS, (end_frame - 0.5) / VIDEO_FPS)
+    write_kwargs = moviepy_write_kwargs(get_encoding_profile())
+    write_kwargs['threads'] = threads
+    segment.write_videofile(segment_path, fps=VIDEO_FPS, audio=False, logger=None, **write_kwargs)
+    video.close()
+    return segment_path
+
+
+def concat_segments(segment_paths, music_file, filename, duration):
+    """Join the encoded segments with ffmpeg's concat demuxer and mux the audio track."""
+    list_path = os.path.join(os.path.dirname(segment_paths[0]), 'segments.txt')
+    with open(list_path, 'w') as f:
+        for path in segment_paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+    cmd = [
+        get_setting("FFMPEG_BINARY"), '-y', '-loglevel', 'error',
+        '-f', 'concat', '-safe', '0', '-i', list_path,
+        '-i', music_file,
+        '-map', '0:v:0', '-map', '1:a:0',
+        '-c:v', 'copy',  # Segments are already encoded
+        '-c:a', 'copy' if is_audio_segment(music_file) else 'aac',
+        '-t', str(duration),
+    ]
+    if get_encoding_profile().get('faststart'):
+        cmd += ['-movflags', '+faststart']
+    cmd.append(filename)
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg concat failed: {result.stderr.strip()}")
+
+
+def render_parallel(quote_text, author_text, effect, music_file, filename, workers=None):
+    """Render the video in `workers` (RENDER_WORKERS by default) processes and write it to filename."""
+    # As long as the single-process composite, whose author layer ends TEXT_STAGGER_DELAY later
+    duration = VideoCreator().video_duration(quote_text, author_text)
+    total_frames = frame_count(duration, VIDEO_FPS)
+    workers = max(1, workers or RENDER_WORKERS)
+    frame_ranges = split_frames(total_frames, RENDER_SEGMENTS or workers)
+    # Share the cores between the concurrent x264 encoders
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    segment_dir = tempfile.mkdtemp(prefix='segments_', dir='.')
+    logging.info(f"Rendering {len(frame_ranges)} segments with {workers} workers")
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(render_segment, quote_text, author_text, effect, start, end,
+                            os.path.join(segment_dir, f"segment_{i:03d}.mp4"), threads)
+                for i, (start, end) in enumerate(frame_ranges)
+            ]
+            segment_paths = [future.result() for future in futures]
+        concat_segments(segment_paths, music_file, filename, duration)
+    finally:
+        shutil.rmtree(segment_dir, ignore_errors=True)
+    return filename
@@ -0,0 +1,162 @@
+"""
+Raw-frame render engine
+Composites the solid background and the two text layers in preallocated numpy
+buffers and streams raw RGB frames to an ffmpeg subprocess over stdin,
+bypassing MoviePy's generic compositing
+"""
+
+import logging
+import subprocess
+import numpy as np
+from moviepy.config import get_setting
+from config import *
+from audio_cache import is_audio_segment
+from encoding import get_encoding_profile, ffmpeg_video_args
+from video_creator import VideoCreator, BlurLevelCache, frame_count
+from effects import get_effect
+
+
+class PipeLayer:
+    """
+    A TextLayer with its effect and timing, alpha-blended in place into the canvas.
+    For a frame drawn at `scale` of the video size (a text_layer scaled to match),
+    blur radii are scaled too.
+    """
+
+    def __init__(self, text_layer, effect, delay, duration, fps=None, scale=1):
+        x, y = text_layer.position
+        width, height = text_layer.size
+        self.region = (slice(y, y + height), slice(x, x + width))
+        self.rgb = text_layer.rgb()
+        self.alpha = text_layer.alpha.astype(np.float32) / 255
+        self.start = delay
+        self.duration = duration
+        self.end = delay + duration
+        self.work = np.empty((height, width, 3), dtype=np.float32)
+        effect = get_effect(effect)
+        self.table = effect.keyframes(duration, fps)
+        render, render_levels = effect.blur_render, effect.blur_render_levels
+        if scale != 1 and render:
+            render = lambda frame, strength: effect.blur_render(frame, strength * scale)
+            if render_levels:
+                render_levels = lambda frame, strengths: effect.blur_render_levels(
+                    frame, [strength * scale for strength in strengths])
+        self.blur_cache = (BlurLevelCache(render, render_levels=render_levels)
+                           if 'blur' in self.table.values else None)
+        VideoCreator().set_change_spans(self, self.table.change_spans())
+
+    def blend(self, canvas, t):
+        """Blend the layer's frame at video time t over canvas (float32, modified in place)."""
+        ct = t - self.start
+        if not 0 <= ct < self.duration:
+            return
+        rgb, alpha = self.rgb, self.alpha
+        if self.blur_cache is not None:
+            strength = self.table.value('blur', ct)
+            rgb, alpha = self.blur_cache(rgb, strength), self.blur_cache(alpha, strength)
+        fade = self.table.value('brightness', ct, 1.0)
+        # canvas = canvas * (1 - alpha) + fade * rgb * alpha, without temporaries
+        region = canvas[self.region]
+        work = self.work
+        np.multiply(rgb, fade, out=work)
+        work -= region
+        work *= alpha[..., None]
+        region += work
+
+
+class PipeRenderer:
+    """
+    Renders a solid background plus text layers and encodes them with ffmpeg.
+    Frames are VIDEO_WIDTH x VIDEO_HEIGHT unless a (width, height) size is given.
+    """
+
+    def __init__(self, layers, duration=None, fps=None, size=None):
+        self.layers = layers
+        # Until the last layer ends, like the single-process composite
+        self.duration = duration or max((layer.end for layer in layers), default=VIDEO_DURATION_SECONDS)
+        self.fps = fps or VIDEO_FPS
+        self.size = size or (VIDEO_WIDTH, VIDEO_HEIGHT)
+        self.frame = np.empty((self.size[1], self.size[0], 3), dtype=np.uint8)
+        self.frame[:] = BACKGROUND_COLOR
+        self.canvas = self.frame.astype(np.float32)
+        self.static_spans = VideoCreator().find_static_spans(layers, self.duration)
+
+    def render_frame(self, t):
+        """Composite the frame at time t into self.frame. Only the layer regions are touched."""
+        for layer in self.layers:
+            self.canvas[layer.region] = BACKGROUND_COLOR
+        for layer in self.layers:
+            layer.blend(self.canvas, t)
+        for layer in self.layers:
+            # Truncating cast, like MoviePy's conversion of composited frames to uint8
+            np.copyto(self.frame[layer.region], self.canvas[layer.region], casting='unsafe')
+        return self.frame
+
+    def static_span_at(self, t):
+        for span in self.static_spans:
+            if span[0] < t < span[1]:
+                return span
+        return None
+
+    def write(self, filename, music_file=None, video_args=None):
+        """
+        Encode the video to filename. video_args default to the ENCODING_PROFILE
+        settings; without a music_file the output has no audio track.
+        """
+        if video_args is None:
+            video_args = ffmpeg_video_args(get_encoding_profile(), self.fps)
+        cmd = [
+            get_setting("FFMPEG_BINARY"), '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+            '-s', f"{self.size[0]}x{self.size[1]}", '-r', str(self.fps),
+            '-i', '-',
+        ]
+        if music_file:
+            cmd += ['-i', music_file, '-map', '0:v:0', '-map', '1:a:0',
+                    '-c:a', 'copy' if is_audio_segment(music_file) else 'aac']
+        else:
+            cmd += ['-an']
+        cmd += video_args + ['-t', str(self.duration), filename]
+        total_frames = frame_count(self.duration, self.fps)
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            last_span = None
+            for i in range(total_frames):
+                t = i / self.fps
+                span = self.static_span_at(t)
+                # Inside a static span the buffer still holds the right frame
+                if span is None or span != last_span:
+                    self.render_frame(t)
+                last_span = span
+                process.stdin.write(self.frame.data)
+        finally:
+            process.stdin.close()
+            stderr = process.stderr.read().decode(errors='replace')
+            process.wait()
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {stderr.strip()}")
+        return filename
+
+
+def build_text_layers(quote_text, author_text):
+    """(TextLayer, delay) of the quote and author, laid out as VideoCreator.build_video does."""
+    creator = VideoCreator()
+    return [(creator.create_text_layer(text, font_size, color, position, max_width), delay)
+            for text, font_size, color, position, max_width, delay
+            in creator.text_layer_specs(quote_text, author_text)]
+
+
+def build_pipe_layers(quote_text, author_text, effect):
+    """PipeLayers for the quote and author, laid out as VideoCreator.build_video does."""
+    return [PipeLayer(text_layer, effect, delay, VIDEO_DURATION_SECONDS)
+            for text_layer, delay in build_text_layers(quote_text, author_text)]
+
+
+def render_pipe(quote_text, author_text, effect, music_file, filename, encoder_threads=None):
+    """Render the quote video through PipeRenderer and write it to filename."""
+    renderer = PipeRenderer(build_pipe_layers(quote_text, author_text, effect))
+    logging.info(f"Rendering {renderer.duration}s through the raw-frame pipe")
+    video_args = None
+    if encoder_threads:
+        video_args = ffmpeg_video_args(dict(get_encoding_profile(), threads=encoder_threads), VIDEO_FPS)
+    return renderer.write(filename, music_file, video_args)
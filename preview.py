@@ -0,0 +1,126 @@
+"""
+Draft previews
+Renders a quote through the same layout and effect code as the final video
+(PipeRenderer over build_text_layers), either as a single downscaled PNG
+keyframe or as a small, low-FPS, intra-only silent MP4, and checks the layout
+for text clipped at the frame edges or overlapping the author. Text is laid
+out at full size, then the layers are scaled down and composited at preview
+size
+
+Usage: python preview.py "Quote text" "Author" [--effect blur] [--video] [--output preview.png]
+"""
+
+import copy
+import time
+import argparse
+from PIL import Image
+import numpy as np
+from config import *
+from pipe_render import PipeLayer, PipeRenderer, build_text_layers
+
+PREVIEW_KINDS = ['png', 'video']
+
+
+def preview_size():
+    """Preview frame size: the video scaled by PREVIEW_SCALE, rounded to even pixels for yuv420p."""
+    return (max(2, int(VIDEO_WIDTH * PREVIEW_SCALE) // 2 * 2),
+            max(2, int(VIDEO_HEIGHT * PREVIEW_SCALE) // 2 * 2))
+
+
+def preview_video_args():
+    return [
+        '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-preset', 'ultrafast',
+        '-g', '1',  # Every frame a keyframe, so previews can be scrubbed
+        '-crf', str(PREVIEW_CRF),
+    ]
+
+
+def scale_text_layer(text_layer, size):
+    """A copy of a full-size TextLayer scaled to a frame of `size` (width, height)."""
+    scale_x, scale_y = size[0] / VIDEO_WIDTH, size[1] / VIDEO_HEIGHT
+    (x, y), (width, height) = text_layer.position, text_layer.size
+    left, top = int(x * scale_x), int(y * scale_y)
+    right = min(size[0], max(left + 1, round((x + width) * scale_x)))
+    bottom = min(size[1], max(top + 1, round((y + height) * scale_y)))
+    scaled = copy.copy(text_layer)
+    scaled.position = (left, top)
+    scaled.alpha, scaled.fill = (np.array(Image.fromarray(plane).resize((right - left, bottom - top), Image.BILINEAR))
+                                 for plane in (text_layer.alpha, text_layer.fill))
+    return scaled
+
+
+def ink_box(text_layer):
+    """Frame coordinates (left, top, right, bottom) of a TextLayer's ink, or None."""
+    rows = np.flatnonzero(text_layer.alpha.any(axis=1))
+    cols = np.flatnonzero(text_layer.alpha.any(axis=0))
+    if not len(rows):
+        return None
+    x, y = text_layer.position
+    return x + cols[0], y + rows[0], x + cols[-1] + 1, y + rows[-1] + 1
+
+
+def layout_warnings(layers):
+    """Problems a reviewer should see: text touching the frame edges, or the quote running into the author."""
+    warnings = []
+    boxes = [ink_box(layer) for layer in layers]
+    for name, box in zip(['quote', 'author'], boxes):
+        if box is None:
+            warnings.append(f"{name} has no visible text")
+        elif box[0] <= 0 or box[1] <= 0 or box[2] >= VIDEO_WIDTH or box[3] >= VIDEO_HEIGHT:
+            warnings.append(f"{name} text reaches the frame edge and may be clipped")
+    if len(boxes) == 2 and boxes[0] and boxes[1] and boxes[0][3] > boxes[1][1]:
+        warnings.append(f"quote overlaps the author by {boxes[0][3] - boxes[1][1]}px")
+    return warnings
+
+
+def render_preview(quote_text, author_text, effect, filename, kind='png', keyframe_time=None):
+    """
+    Write a preview of the quote video to filename and return a result dict with
+    the file, layout warnings and render time. 'png' renders the frame at
+    keyframe_time (PREVIEW_KEYFRAME_TIME by default); 'video' the whole video at PREVIEW_FPS.
+    """
+    start = time.perf_counter()
+    text_layers = build_text_layers(quote_text, author_text)
+    size = preview_size()
+    layers = [PipeLayer(scale_text_layer(text_layer, size), effect, delay, VIDEO_DURATION_SECONDS,
+                        PREVIEW_FPS, scale=size[0] / VIDEO_WIDTH)
+              for text_layer, delay in text_layers]
+    renderer = PipeRenderer(layers, fps=PREVIEW_FPS, size=size)
+    if kind == 'png':
+        frame = renderer.render_frame(PREVIEW_KEYFRAME_TIME if keyframe_time is None else keyframe_time)
+        Image.fromarray(frame).save(filename)
+    elif kind == 'video':
+        renderer.write(filename, video_args=preview_video_args())
+    else:
+        raise ValueError(f"Unknown preview kind: {kind}")
+    return {
+        'quote': quote_text,
+        'author': author_text,
+        'effect': effect,
+        'file': filename,
+        'warnings': layout_warnings([text_layer for text_layer, _ in text_layers]),
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a quick preview of a quote video.")
+    parser.add_argument('quote')
+    parser.add_argument('author')
+    parser.add_argument('--effect', default='fade', choices=AVAILABLE_EFFECTS)
+    parser.add_argument('--video', action='store_true', help="Render a low-FPS MP4 instead of a PNG keyframe")
+    parser.add_argument('--time', type=float, help="Time of the PNG keyframe (default: PREVIEW_KEYFRAME_TIME)")
+    parser.add_argument('--output', help="Output file (default: preview.png / preview.mp4)")
+    args = parser.parse_args()
+
+    kind = 'video' if args.video else 'png'
+    filename = args.output or f"preview.{'mp4' if args.video else 'png'}"
+    result = render_preview(args.quote, args.author, args.effect, filename, kind, args.time)
+    print(f"{result['file']} rendered in {result['seconds']}s")
+    for warning in result['warnings']:
+        print(f"  warning: {warning}")
+    return result
+
+
+if __name__ == '__main__':
+    main()
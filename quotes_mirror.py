@@ -0,0 +1,126 @@
+"""
+Local mirror of the quotes sheet
+SQLite copy of the quotes worksheet. It is downloaded again only when the
+spreadsheet's Drive modifiedTime changes; the next unused quote is a lookup in
+a partial index instead of a scan of a DataFrame; and local edits show up
+right away while the sheet itself is written through the sheet journal
+"""
+
+import json
+import sqlite3
+import logging
+import pandas as pd
+from config import *
+
+USED_VALUES = ('yes', 'true', '1')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS quotes (
+    row_index INTEGER PRIMARY KEY,  -- DataFrame index: sheet row - 2
+    record TEXT NOT NULL,           -- The row as JSON, keyed by header
+    quote TEXT,
+    author TEXT,
+    used INTEGER NOT NULL DEFAULT 0,
+    reserved TEXT
+);
+CREATE INDEX IF NOT EXISTS quotes_unused ON quotes (row_index) WHERE used = 0;
+"""
+
+
+def is_used(value):
+    return str(value).strip().lower() in USED_VALUES
+
+
+class QuotesMirror:
+    """The quotes worksheet mirrored into the SQLite database at path (QUOTES_MIRROR_PATH by default)."""
+
+    def __init__(self, path=None):
+        self.path = path or QUOTES_MIRROR_PATH
+        self.db = sqlite3.connect(self.path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def get_meta(self, key, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row['value']) if row else default
+
+    def set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def header(self):
+        return self.get_meta('header', [])
+
+    def sync(self, worksheet, force=False, pending=()):
+        """
+        Download the worksheet if the spreadsheet changed since the last sync (or
+        with force). Updates not written to the sheet yet, as (sheet row,
+        column_name, value) like SheetJournal.pending(), are applied on top.
+        Returns whether it downloaded.
+        """
+        modified_time = worksheet.spreadsheet.get_lastUpdateTime()
+        if not force and modified_time == self.get_meta('modified_time'):
+            logging.info("Quotes mirror is up to date")
+            return False
+        records = worksheet.get_all_records()
+        header = list(records[0].keys()) if records else worksheet.row_values(1)
+        with self.db:
+            self.db.execute("DELETE FROM quotes")
+            self.db.executemany(
+                "INSERT INTO quotes (row_index, record, quote, author, used, reserved) VALUES (?, ?, ?, ?, ?, ?)",
+                [self.row_values(i, record) for i, record in enumerate(records)])
+            for row, column_name, value in pending:
+                self.update_cell(row - 2, column_name, value)
+            self.set_meta('header', header)
+            self.set_meta('modified_time', modified_time)
+        logging.info(f"Synced {len(records)} quotes into the mirror (modified {modified_time})")
+        return True
+
+    def row_values(self, row_index, record):
+        return (row_index, json.dumps(record), record.get('Quote'), record.get('Author'),
+                int(is_used(record.get('Used', ''))), str(record.get('Reserved', '') or ''))
+
+    def update_cell(self, row_index, column_name, value):
+        row = self.db.execute("SELECT record FROM quotes WHERE row_index = ?", (row_index,)).fetchone()
+        if row is None:
+            return
+        record = json.loads(row['record'])
+        record[column_name] = value
+        self.db.execute(
+            "UPDATE quotes SET record = ?, quote = ?, author = ?, used = ?, reserved = ? WHERE row_index = ?",
+            self.row_values(row_index, record)[1:] + (row_index,))
+
+    def set_cell(self, row_index, column_name, value):
+        """Change a cell of the mirror only; the sheet is written through the sheet journal."""
+        with self.db:
+            self.update_cell(row_index, column_name, value)
+            header = self.header()
+            if column_name not in header:
+                self.set_meta('header', header + [column_name])
+
+    def is_current(self, worksheet):
+        """Whether nobody changed the spreadsheet since the last sync."""
+        return worksheet.spreadsheet.get_lastUpdateTime() == self.get_meta('modified_time')
+
+    def mark_current(self, worksheet):
+        """Accept the spreadsheet's current version, after writing cells already applied with set_cell."""
+        with self.db:
+            self.set_meta('modified_time', worksheet.spreadsheet.get_lastUpdateTime())
+
+    def dataframe(self):
+        """The mirrored quotes as the DataFrame get_all_records would have produced."""
+        rows = self.db.execute("SELECT row_index, record FROM quotes ORDER BY row_index").fetchall()
+        if not rows:
+            return pd.DataFrame(columns=self.header())
+        return pd.DataFrame([json.loads(row['record']) for row in rows], index=[row['row_index'] for row in rows])
+
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM quotes").fetchone()[0]
+
+    def next_unused(self, skip=None):
+        """First quote (row_index, quote, author, reserved) not marked used, and not rejected by skip."""
+        for row in self.db.execute(
+                "SELECT row_index, quote, author, reserved FROM quotes WHERE used = 0 ORDER BY row_index"):
+            if skip is None or not skip(row):
+                return row
+        return None
@@ -0,0 +1,347 @@
+"""
+Render and pipeline benchmark
+Times text rasterization (create_text_image), the per-frame cost of each effect
+in AVAILABLE_EFFECTS, a full render of each preset in PRESETS and the whole
+create_video path. Google Sheets, Drive and the Graph API are stubbed, so it
+runs offline; the results are written as JSON to compare across commits
+
+Usage: python render_benchmark.py [--suites text effects presets pipeline] [--json results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+from moviepy.config import get_setting
+import config
+from config import *
+import text_layout
+from audio_cache import file_checksum
+from video_creator import VideoCreator
+from pipe_render import PipeRenderer, build_pipe_layers
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SUITES = ['text', 'effects', 'presets', 'pipeline']
+TEXT_CASES = {
+    'short': "Be yourself.",
+    'medium': "The only way to do great work is to love what you do. If you haven't found it yet, keep looking. Don't settle.",
+    'very_long': " ".join([
+        "Success is not final, failure is not fatal: it is the courage to continue that counts.",
+        "Do not wait to strike till the iron is hot; but make it hot by striking.",
+        "It always seems impossible until it's done, and the secret of getting ahead is getting started.",
+        "What lies behind us and what lies before us are tiny matters compared to what lies within us.",
+        "The future belongs to those who believe in the beauty of their dreams.",
+    ]),
+}
+REFERENCE_QUOTE = TEXT_CASES['medium']
+REFERENCE_AUTHOR = "Steve Jobs"
+MUSIC_SECONDS = 65  # Longer than every preset
+
+
+@contextmanager
+def patched_settings(**settings):
+    """
+    Override config values for the duration of the block. Every module of the
+    repo copies config with `from config import *`, so each copy is patched.
+    """
+    modules = [module for module in list(sys.modules.values())
+               if os.path.dirname(os.path.abspath(getattr(module, '__file__', None) or '')) == REPO_DIR]
+    saved = []
+    for module in modules:
+        for name, value in settings.items():
+            if hasattr(module, name):
+                saved.append((module, name, getattr(module, name)))
+                setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for module, name, value in reversed(saved):
+            setattr(module, name, value)
+
+
+def clear_text_caches():
+    text_layout.get_font.cache_clear()
+    text_layout.get_metrics.cache_clear()
+    text_layout.layout_text.cache_clear()
+
+
+def timing_stats(seconds):
+    ms = sorted(value * 1000 for value in seconds)
+    return {
+        'runs': len(ms),
+        'mean_ms': round(statistics.mean(ms), 3),
+        'median_ms': round(statistics.median(ms), 3),
+        'p95_ms': round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        'max_ms': round(ms[-1], 3),
+    }
+
+
+def make_music(path, seconds=MUSIC_SECONDS):
+    """A sine tone standing in for a Drive music track."""
+    result = subprocess.run([get_setting("FFMPEG_BINARY"), '-y', '-nostdin', '-loglevel', 'error',
+                             '-f', 'lavfi', '-i', f"sine=frequency=440:duration={seconds}",
+                             '-c:a', 'aac', '-b:a', '128k', path], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()[-500:]}")
+    return path
+
+
+def benchmark_text(repeat):
+    """Cold (empty font/layout caches) and warm cost of create_text_image per quote length."""
+    creator = VideoCreator()
+    results = []
+    for case, text in TEXT_CASES.items():
+        cold, warm = [], []
+        for _ in range(repeat):
+            clear_text_caches()
+            start = time.perf_counter()
+            creator.create_text_image(text, QUOTE_FONT_SIZE, QUOTE_COLOR, 'center', VIDEO_WIDTH - 300)
+            cold.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            creator.create_text_image(text, QUOTE_FONT_SIZE, QUOTE_COLOR, 'center', VIDEO_WIDTH - 300)
+            warm.append(time.perf_counter() - start)
+        results.append({'case': case, 'chars': len(text), 'cold': timing_stats(cold), 'warm': timing_stats(warm)})
+    return results
+
+
+def benchmark_effects(effects, seconds):
+    """Per-frame cost of each effect over its first `seconds`, in the MoviePy and pipe renderers."""
+    frames = int(seconds * VIDEO_FPS)
+    results = []
+    for effect in effects:
+        video = VideoCreator().build_video(REFERENCE_QUOTE, REFERENCE_AUTHOR, effect)
+        moviepy_times = []
+        for i in range(frames):
+            start = time.perf_counter()
+            video.get_frame(i / VIDEO_FPS)
+            moviepy_times.append(time.perf_counter() - start)
+        video.close()
+        renderer = PipeRenderer(build_pipe_layers(REFERENCE_QUOTE, REFERENCE_AUTHOR, effect))
+        pipe_times = []
+        for i in range(frames):
+            start = time.perf_counter()
+            renderer.render_frame(i / VIDEO_FPS)
+            pipe_times.append(time.perf_counter() - start)
+        results.append({'effect': effect, 'frames': frames,
+                        'moviepy': timing_stats(moviepy_times), 'pipe': timing_stats(pipe_times)})
+    return results
+
+
+def benchmark_presets(presets, effect, render_mode, music_file, work_dir):
+    """Full render of the reference reel under each preset."""
+    results = []
+    for name in presets:
+        preset = PRESETS[name]
+        with patched_settings(**preset):
+            path = os.path.join(work_dir, f"preset_{name}.mp4")
+            start = time.perf_counter()
+            VideoCreator().render_video(REFERENCE_QUOTE, REFERENCE_AUTHOR, effect, music_file, path, render_mode)
+            seconds = time.perf_counter() - start
+        duration = preset.get('VIDEO_DURATION_SECONDS', VIDEO_DURATION_SECONDS)
+        results.append({
+            'preset': name,
+            'size': f"{preset.get('VIDEO_WIDTH', VIDEO_WIDTH)}x{preset.get('VIDEO_HEIGHT', VIDEO_HEIGHT)}",
+            'duration': duration,
+            'render_seconds': round(seconds, 2),
+            'realtime_factor': round(duration / seconds, 3),
+            'size_bytes': os.path.getsize(path),
+        })
+        os.remove(path)
+    return results
+
+
+class StubResponse:
+    def __init__(self, payload):
+        self.payload = payload
+        self.status_code = 200
+
+    def json(self):
+        return self.payload
+
+
+class StubGraphAPI:
+    """Stands in for `requests` in main: every container is FINISHED at once and publishes."""
+
+    def __init__(self):
+        self.calls = []
+
+    def post(self, url, data=None, **kwargs):
+        self.calls.append(('POST', url))
+        if url.endswith('/media_publish'):
+            return StubResponse({'id': 'benchmark_media'})
+        return StubResponse({'id': 'benchmark_container'})
+
+    def get(self, url, **kwargs):
+        self.calls.append(('GET', url))
+        return StubResponse({'status_code': 'FINISHED'})
+
+
+def offline_agent(music_file):
+    """An InstagramAIAgent whose Sheets and Drive calls are served locally."""
+    import main
+    agent = object.__new__(main.InstagramAIAgent)
+    agent.progress_data = {}
+    agent.drive_service = None
+    agent.instagram_api = None
+    agent.video_creator = VideoCreator()
+    agent.render_cache = None  # Measure the render, not a cache hit
+    agent.quotes_mirror = None  # Quotes come from the stubs below
+    agent.get_quotes_from_sheet = lambda: pd.DataFrame(
+        [{'Quote': REFERENCE_QUOTE, 'Author': REFERENCE_AUTHOR, 'Used': ''}])
+    agent.next_streamed_quote = lambda: (REFERENCE_QUOTE, REFERENCE_AUTHOR, 0)
+    agent.list_drive_music_files = lambda: [
+        {'id': 'benchmark', 'name': os.path.basename(music_file), 'md5Checksum': file_checksum(music_file)}]
+    agent.download_drive_file = lambda file_id, destination_path: shutil.copyfile(music_file, destination_path)
+    agent.upload_to_drive = lambda file_path, filename: 'benchmark_drive_file'
+    agent.delete_drive_file = lambda file_id: None
+    agent.mark_quote_as_used = lambda quote_index: True
+    agent.save_progress = lambda: None
+    return main, agent
+
+
+def benchmark_pipeline(render_mode, music_file):
+    """The end-to-end create_video path: quote, music, render and publish, with stubbed APIs."""
+    main, agent = offline_agent(music_file)
+    stages = {}
+    videos = []
+
+    def timed(stage, method):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stages[stage] = round(time.perf_counter() - start, 3)
+        return wrapper
+
+    render_quote_video = agent.render_quote_video
+
+    def render(*args):
+        video_filename = render_quote_video(*args)
+        videos.append(video_filename)
+        return video_filename
+
+    agent.render_quote_video = timed('render', render)
+    agent.publish_reel = timed('publish', agent.publish_reel)
+    graph_api = StubGraphAPI()
+    saved_requests = main.requests
+    main.requests = graph_api
+    try:
+        with patched_settings(RENDER_MODE=render_mode, UPLOAD_TO_DRIVE=True):
+            start = time.perf_counter()
+            success = agent.create_video()
+            total_seconds = time.perf_counter() - start
+    finally:
+        main.requests = saved_requests
+    size_bytes = None
+    for video_filename in videos:
+        if video_filename and os.path.exists(video_filename):
+            size_bytes = os.path.getsize(video_filename)
+            os.remove(video_filename)
+    return {
+        'success': success,
+        'render_mode': render_mode,
+        'total_seconds': round(total_seconds, 2),
+        'stage_seconds': stages,
+        'graph_api_calls': len(graph_api.calls),
+        'size_bytes': size_bytes,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_results(results):
+    for result in results.get('text', []):
+        print(f"text {result['case']:<10} ({result['chars']:>3} chars)  "
+              f"cold {result['cold']['median_ms']:>8.1f} ms  warm {result['warm']['median_ms']:>8.1f} ms")
+    for result in results.get('effects', []):
+        print(f"effect {result['effect']:<14} moviepy {result['moviepy']['mean_ms']:>8.1f} ms/frame  "
+              f"pipe {result['pipe']['mean_ms']:>8.1f} ms/frame")
+    for result in results.get('presets', []):
+        print(f"preset {result['preset']:<16} {result['duration']:>3}s  {result['render_seconds']:>7.2f}s  "
+              f"x{result['realtime_factor']:.2f} realtime  {result['size_bytes'] / 1024:>8.0f} KB")
+    if 'pipeline' in results:
+        result = results['pipeline']
+        print(f"create_video {'ok' if result['success'] else 'FAILED'}  {result['total_seconds']:.2f}s  "
+              f"stages {result['stage_seconds']}")
+
+
+def failed_suites(results):
+    """Suites that ran but did not succeed (the others raise on failure)."""
+    return [suite for suite in ['pipeline'] if suite in results and not results[suite]['success']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text rendering, effects, presets and create_video offline.")
+    parser.add_argument('--suites', nargs='+', default=SUITES, choices=SUITES,
+                        help="Benchmarks to run (default: all)")
+    parser.add_argument('--effects', nargs='+', default=list(AVAILABLE_EFFECTS), choices=AVAILABLE_EFFECTS,
+                        help="Effects of the per-frame benchmark (default: all)")
+    parser.add_argument('--presets', nargs='+', default=list(PRESETS), choices=list(PRESETS),
+                        help="Presets to render (default: all)")
+    parser.add_argument('--effect', default='diamond_blur', choices=AVAILABLE_EFFECTS,
+                        help="Text effect of the preset renders")
+    parser.add_argument('--render-mode', default=RENDER_MODE, choices=['single', 'parallel', 'pipe'],
+                        help="Render mode of the preset and create_video benchmarks")
+    parser.add_argument('--frame-seconds', type=float, default=BLUR_CLEAR_DURATION + 1,
+                        help="Seconds of video timed per effect")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per text case")
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='render_benchmark_')
+    results = {}
+    try:
+        music_file = make_music(os.path.join(work_dir, 'benchmark_music.m4a'))
+        # Keep the benchmark's audio segments out of the real audio cache
+        with patched_settings(AUDIO_CACHE_DIR=os.path.join(work_dir, 'audio_cache')):
+            if 'text' in args.suites:
+                print("Timing create_text_image...")
+                results['text'] = benchmark_text(args.repeat)
+            if 'effects' in args.suites:
+                print("Timing effect frames...")
+                results['effects'] = benchmark_effects(args.effects, args.frame_seconds)
+            if 'presets' in args.suites:
+                print(f"Rendering presets ({args.render_mode})...")
+                results['presets'] = benchmark_presets(args.presets, args.effect, args.render_mode, music_file, work_dir)
+            if 'pipeline' in args.suites:
+                print("Running create_video with stubbed APIs...")
+                results['pipeline'] = benchmark_pipeline(args.render_mode, music_file)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_results(results)
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'cpu_count': os.cpu_count(),
+        'settings': {name: getattr(config, name) for name in
+                     ['VIDEO_WIDTH', 'VIDEO_HEIGHT', 'VIDEO_DURATION_SECONDS', 'VIDEO_FPS',
+                      'ENCODING_PROFILE', 'BLUR_BACKEND', 'AUDIO_CACHE_ENABLED']},
+        'results': results,
+        'failed': failed_suites(results),
+    }
+    if report['failed']:
+        print(f"FAILED: {', '.join(report['failed'])}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main()['failed'] else 0)
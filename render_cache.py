@@ -0,0 +1,125 @@
+"""
+Render cache
+Content-addressed store of rendered videos. The key hashes the quote, author,
+effect, music track and every setting that changes the output, so a run that
+retries a post (after a failed upload or publish) reuses the MP4 instead of
+rendering it again. Renders are marked published once posted, so a quote that
+comes around again gets a new render instead of a repost. The cache is capped at RENDER_CACHE_MAX_MB and evicts the
+least recently used videos
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import config
+from config import *
+from encoding import get_encoding_profile
+
+# Settings that change the rendered video, hashed into every key
+VIDEO_CONFIG_KEYS = [
+    'VIDEO_WIDTH', 'VIDEO_HEIGHT', 'VIDEO_DURATION_SECONDS', 'VIDEO_FPS', 'BACKGROUND_COLOR',
+    'RENDER_MODE',  # Renderers differ in rounding and, before they were aligned, in length
+    'QUOTE_FONT_SIZE', 'QUOTE_COLOR', 'AUTHOR_FONT_SIZE', 'AUTHOR_COLOR', 'FONT_PATHS',
+    'TEXT_FADE_IN_DURATION', 'TEXT_FADE_OUT_DURATION', 'TEXT_STAGGER_DELAY',
+    'BLUR_MAX_RADIUS', 'DIAMOND_BLUR_RADII', 'BLUR_CLEAR_DURATION', 'BLUR_CACHE_LEVELS',
+    'BLUR_BACKEND', 'BLUR_NUMPY_MIN_RADIUS', 'TEXT_LAYER_PADDING',
+    'AUDIO_CACHE_ENABLED', 'AUDIO_FADE_OUT_DURATION', 'AUDIO_BITRATE',
+]
+INDEX_FILE = 'index.json'
+
+
+def render_key(quote, author, effect, music_id, profile_name=None):
+    """Hex digest identifying the video these inputs and the current settings render to."""
+    payload = {
+        'quote': quote,
+        'author': author,
+        'effect': effect,
+        'music_id': music_id,
+        'video': {name: getattr(config, name) for name in VIDEO_CONFIG_KEYS},
+        'encoding': [profile_name or ENCODING_PROFILE, get_encoding_profile(profile_name)],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class RenderCache:
+    """Rendered MP4s in `directory`, indexed by render_key, with LRU eviction above max_bytes."""
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or RENDER_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else RENDER_CACHE_MAX_MB * 1024 * 1024
+        self.index_path = os.path.join(self.directory, INDEX_FILE)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def load_index(self):
+        # Re-read on every operation so other processes' entries are kept
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_index(self, index):
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(temp_path, self.index_path)
+
+    def get(self, key):
+        """Path of the cached video for key (marking it recently used), or None."""
+        index = self.load_index()
+        entry = index.get(key)
+        if entry is None:
+            return None
+        path = os.path.join(self.directory, entry['file'])
+        if not os.path.exists(path):
+            del index[key]
+            self.save_index(index)
+            return None
+        entry['last_used'] = time.time()
+        entry.pop('published', None)  # Fetched for a new post, which has not happened yet
+        self.save_index(index)
+        return path
+
+    def put(self, key, video_path, **metadata):
+        """Move a rendered video into the cache and return its new path. metadata is kept in the index."""
+        name = f"{key[:16]}_{os.path.basename(video_path)}"
+        path = os.path.join(self.directory, name)
+        os.replace(video_path, path)
+        index = self.load_index()
+        index[key] = dict(metadata, file=name, size=os.path.getsize(path), last_used=time.time())
+        self.evict(index, keep=key)
+        self.save_index(index)
+        return path
+
+    def evict(self, index, keep=None):
+        """Drop least recently used entries from index (and disk) until it fits max_bytes."""
+        total = sum(entry['size'] for entry in index.values())
+        for key, entry in sorted(index.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.directory, entry['file']))
+            except OSError:
+                pass
+            total -= entry['size']
+            del index[key]
+            logging.info(f"Evicted {entry['file']} from the render cache")
+
+    def mark_published(self, quote, author):
+        """Mark every render of this quote as posted, so last_render no longer offers it."""
+        index = self.load_index()
+        for entry in index.values():
+            if entry.get('quote') == quote and entry.get('author') == author:
+                entry['published'] = True
+        self.save_index(index)
+
+    def last_render(self, quote, author):
+        """Index entry of the most recently used render of this quote not yet posted, or None."""
+        entries = [entry for entry in self.load_index().values()
+                   if entry.get('quote') == quote and entry.get('author') == author
+                   and not entry.get('published')]
+        return max(entries, key=lambda entry: entry['last_used']) if entries else None
@@ -0,0 +1,99 @@
+"""
+Render-ahead queue
+Durable on-disk queue of pre-rendered reels, each assigned to one of the
+upcoming OPTIMAL_POSTING_TIMES slots. A producer (main.py --render-ahead) fills
+it during idle hours; a consumer (main.py --publish-next) only uploads and
+publishes the reel that is due
+"""
+
+import os
+import json
+import shutil
+import socket
+from datetime import datetime, timedelta
+from config import *
+
+
+def posting_slots(after, count, taken=()):
+    """The next `count` OPTIMAL_POSTING_TIMES slots after `after`, skipping those in taken."""
+    times = sorted(tuple(map(int, time_str.split(':'))) for time_str in OPTIMAL_POSTING_TIMES)
+    taken = set(taken)
+    slots = []
+    day = after.replace(hour=0, minute=0, second=0, microsecond=0)
+    while len(slots) < count:
+        for hour, minute in times:
+            slot = day.replace(hour=hour, minute=minute)
+            if slot > after and slot not in taken and len(slots) < count:
+                slots.append(slot)
+        day += timedelta(days=1)
+    return slots
+
+
+def reservation_token():
+    """Value written to a quote's 'Reserved' cell: who reserved it, and when."""
+    return f"{socket.gethostname()}:{os.getpid()}@{datetime.now().isoformat(timespec='seconds')}"
+
+
+def reservation_active(value, now=None):
+    """Whether a 'Reserved' cell value still holds the quote (reservations expire after RESERVATION_TTL_HOURS)."""
+    value = str(value or '').strip()
+    if not value:
+        return False
+    try:
+        reserved_at = datetime.fromisoformat(value.rsplit('@', 1)[1])
+    except (IndexError, ValueError):
+        return True  # Set by hand; only a person clears it
+    return (now or datetime.now()) - reserved_at < timedelta(hours=RESERVATION_TTL_HOURS)
+
+
+class RenderQueue:
+    """
+    Queued reels in `directory`: <id>.mp4 next to an <id>.json entry with the
+    quote, its sheet index, effect, music and posting slot. The entry is written
+    last (atomically), so a crash never leaves an entry without its video.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or RENDER_QUEUE_DIR
+        os.makedirs(self.directory, exist_ok=True)
+
+    def entries(self):
+        """All queued entries, earliest slot first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            with open(os.path.join(self.directory, name), 'r') as f:
+                entries.append(json.load(f))
+        return sorted(entries, key=lambda entry: entry['slot'])
+
+    def slots(self):
+        return [datetime.fromisoformat(entry['slot']) for entry in self.entries()]
+
+    def video_path(self, entry):
+        return os.path.join(self.directory, entry['video'])
+
+    def add(self, video_path, slot, **fields):
+        """Copy a rendered video into the queue for `slot` and return its entry."""
+        entry_id = f"{slot.strftime('%Y%m%d_%H%M')}_{fields.get('quote_index', 'x')}"
+        entry = dict(fields, id=entry_id, slot=slot.isoformat(), video=f"{entry_id}.mp4",
+                     queued=datetime.now().isoformat(timespec='seconds'))
+        shutil.copyfile(video_path, self.video_path(entry))
+        temp_path = os.path.join(self.directory, f"{entry_id}.json.tmp")
+        with open(temp_path, 'w') as f:
+            json.dump(entry, f, indent=2)
+        os.replace(temp_path, os.path.join(self.directory, f"{entry_id}.json"))
+        return entry
+
+    def next_due(self, now=None):
+        """The earliest entry whose slot has come, or None."""
+        now = now or datetime.now()
+        for entry in self.entries():
+            if datetime.fromisoformat(entry['slot']) <= now:
+                return entry
+        return None
+
+    def remove(self, entry):
+        os.remove(os.path.join(self.directory, f"{entry['id']}.json"))
+        if os.path.exists(self.video_path(entry)):
+            os.remove(self.video_path(entry))
@@ -0,0 +1,185 @@
+"""
+External request scheduler
+Every call to Google Sheets, Google Drive and the Graph API goes through one
+shared scheduler. Each API has a token bucket sized to its quota
+(API_RATE_LIMITS), so bursts are spread out before the API starts refusing
+them, and calls refused anyway (429, 5xx, Drive's rate-limit 403s, Graph
+rate-limit error codes, dropped connections) are retried with exponential
+backoff and full jitter, honoring Retry-After. Calls that must not run twice
+(idempotent=False: publishing, creating files, structural sheet edits) are only
+retried when the API refused them outright, never after a 5xx or a lost reply
+the server may already have acted on. Waits and retries are added to the
+metrics stage the call was made in
+
+    response = request_scheduler().call('graph', requests.get, url, params=params)
+    response = request_scheduler().call('graph', requests.post, url, data=payload, idempotent=False)
+    results = request_scheduler().execute('drive', drive_service.files().list(q=query))
+"""
+
+import time
+import random
+import logging
+import threading
+import requests
+from config import *
+from metrics import active_stage
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Graph API errors meaning "slow down": app, user, page and per-account limits
+GRAPH_THROTTLE_CODES = {4, 17, 32, 613}
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError)
+
+scheduler = None
+
+
+class TokenBucket:
+    """`rate` requests per second on average, up to `burst` at once."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until it is available. Returns the seconds waited."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Callers queue up by taking tokens ahead; each sleeps until its own is refilled
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def drain(self):
+        """The API refused a call: spend the burst so the next calls come at the sustained rate."""
+        with self.lock:
+            self.tokens = min(self.tokens, 0)
+
+
+def error_response(error):
+    """(status, Retry-After) of a failed call's exception: gspread/requests errors or googleapiclient HttpError."""
+    response = getattr(error, 'response', None)
+    if response is not None and hasattr(response, 'status_code'):
+        return response.status_code, response.headers.get('Retry-After')
+    resp = getattr(error, 'resp', None)
+    if resp is not None and hasattr(resp, 'status'):
+        return resp.status, resp.get('retry-after')
+    return None, None
+
+
+def error_content(error):
+    """Response body of a failed call's exception: gspread/requests errors or googleapiclient HttpError."""
+    response = getattr(error, 'response', None)
+    if response is not None and hasattr(response, 'content'):
+        return response.content or b''
+    return getattr(error, 'content', b'') or b''
+
+
+def is_rejected_error(error):
+    """Whether the API refused the call for quota before acting on it (429, Drive's rate-limit 403)."""
+    status, _ = error_response(error)
+    if status == 403:
+        # Drive reports its per-user limits as 403 rateLimitExceeded / userRateLimitExceeded
+        return b'ateLimitExceeded' in error_content(error)
+    return status == 429
+
+
+def is_throttled_error(error):
+    """Whether a failed call may succeed if repeated: refused for quota, or a 5xx."""
+    return is_rejected_error(error) or error_response(error)[0] in RETRY_STATUSES
+
+
+def graph_error(response):
+    if getattr(response, 'status_code', None) not in (400, 403):
+        return {}
+    try:
+        return response.json().get('error', {}) or {}
+    except ValueError:
+        return {}
+
+
+def is_rejected_response(response):
+    """Whether a Graph API response (requests.Response) refused the call for quota before acting on it."""
+    return (getattr(response, 'status_code', None) == 429
+            or graph_error(response).get('code') in GRAPH_THROTTLE_CODES)
+
+
+def is_throttled_response(response):
+    """Whether a Graph API response asks to retry later: refused for quota, a 5xx or a transient error."""
+    return (is_rejected_response(response) or getattr(response, 'status_code', None) in RETRY_STATUSES
+            or bool(graph_error(response).get('is_transient')))
+
+
+class RequestScheduler:
+    """One token bucket per API (see API_RATE_LIMITS) and the retry policy shared by all calls."""
+
+    def __init__(self, limits=None):
+        limits = limits or API_RATE_LIMITS
+        self.buckets = {api: TokenBucket(limit['rate'], limit['burst']) for api, limit in limits.items()}
+
+    def call(self, api, function, *args, idempotent=True, **kwargs):
+        """
+        function(*args, **kwargs) within api's quota. Retryable failures are retried
+        up to API_RETRY_ATTEMPTS times; then the last exception is raised, or the
+        last response returned. Without idempotent, only calls the API refused for
+        quota are retried.
+        """
+        retry_error = is_throttled_error if idempotent else is_rejected_error
+        retry_response = is_throttled_response if idempotent else is_rejected_response
+        bucket = self.buckets[api]
+        attempt = 0
+        while True:
+            record = active_stage()
+            waited = bucket.acquire()
+            if waited:
+                record.throttled += 1
+                record.throttle_seconds += waited
+            try:
+                result = function(*args, **kwargs)
+            except RETRY_EXCEPTIONS as e:
+                # The request may have reached the server before the connection dropped
+                if attempt >= API_RETRY_ATTEMPTS or not idempotent:
+                    raise
+                reason, retry_after = f"{type(e).__name__}: {e}", None
+            except Exception as e:
+                if attempt >= API_RETRY_ATTEMPTS or not retry_error(e):
+                    raise
+                status, retry_after = error_response(e)
+                reason = f"HTTP {status}"
+            else:
+                if attempt >= API_RETRY_ATTEMPTS or not retry_response(result):
+                    return result
+                reason, retry_after = f"HTTP {result.status_code}", result.headers.get('Retry-After')
+            bucket.drain()
+            delay = self.backoff(attempt, retry_after)
+            attempt += 1
+            record.retries += 1
+            record.throttled += 1
+            record.throttle_seconds += delay
+            logging.warning(f"{api} request failed ({reason}), retry {attempt}/{API_RETRY_ATTEMPTS} in {delay:.1f}s")
+            time.sleep(delay)
+
+    def execute(self, api, request, idempotent=True):
+        """A googleapiclient request's execute() through call()."""
+        return self.call(api, request.execute, idempotent=idempotent)
+
+    def backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, but never sooner than the server's Retry-After."""
+        delay = random.uniform(0, min(API_RETRY_MAX_DELAY, API_RETRY_BASE_DELAY * 2 ** attempt))
+        try:
+            return max(delay, float(retry_after or 0))
+        except ValueError:  # An HTTP date instead of seconds
+            return delay
+
+
+def request_scheduler():
+    """The process-wide RequestScheduler."""
+    global scheduler
+    if scheduler is None:
+        scheduler = RequestScheduler()
+    return scheduler
@@ -0,0 +1,85 @@
+"""
+Sheet write journal
+Write-behind journal of the cell updates a run makes to the quotes worksheet
+('Used', 'Reserved' releases, 'music_index'). Updates are recorded in SQLite
+as they happen, later writes to the same cell replace earlier ones, and the
+whole journal is flushed as one batch update at the end of the run. Whatever a
+failed flush leaves behind is replayed by the next run, so a published quote
+is never forgotten because Sheets was unavailable for a moment
+"""
+
+import time
+import logging
+import sqlite3
+from config import *
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending (
+    row INTEGER NOT NULL,         -- 1-based sheet row
+    column_name TEXT NOT NULL,    -- Header of the column, added to the sheet if missing
+    value TEXT,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (row, column_name)
+);
+"""
+
+journal = None
+
+
+class SheetJournal:
+    """Pending cell updates of the quotes worksheet, kept in the SQLite database at path (SHEET_JOURNAL_PATH by default)."""
+
+    def __init__(self, path=None):
+        self.path = path or SHEET_JOURNAL_PATH
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+
+    def record(self, row, column_name, value):
+        """Journal a cell update, replacing any pending update of the same cell."""
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO pending (row, column_name, value, recorded_at) VALUES (?, ?, ?, ?)",
+                (row, column_name, value, time.time()))
+
+    def pending(self):
+        """Pending updates as (row, column_name, value), oldest first."""
+        return [tuple(row) for row in self.db.execute(
+            "SELECT row, column_name, value FROM pending ORDER BY recorded_at")]
+
+    def pending_value(self, row, column_name, default=None):
+        found = self.db.execute("SELECT value FROM pending WHERE row = ? AND column_name = ?",
+                                (row, column_name)).fetchone()
+        return found[0] if found else default
+
+    def flush(self, worksheet, gateway):
+        """
+        Write every pending update to the worksheet in one batch request, adding
+        missing columns after the last header. Entries are removed only once the
+        write succeeded; errors propagate and leave the journal for the next flush.
+        Returns the number of cells written.
+        """
+        updates = self.pending()
+        if not updates:
+            return 0
+        header = worksheet.row_values(1)
+        cells = {}
+        for row, column_name, value in updates:
+            if column_name not in header:
+                header.append(column_name)
+                cells[(1, len(header))] = column_name
+                logging.info(f"Adding '{column_name}' column to Google Sheet")
+            cells[(row, header.index(column_name) + 1)] = value
+        gateway.write_cells(worksheet, cells)
+        with self.db:
+            # An update recorded while the batch was in flight stays pending
+            self.db.executemany("DELETE FROM pending WHERE row = ? AND column_name = ? AND value IS ?", updates)
+        logging.info(f"Flushed {len(updates)} journaled cell updates to the sheet")
+        return len(updates)
+
+
+def sheet_journal():
+    """The process-wide SheetJournal."""
+    global journal
+    if journal is None:
+        journal = SheetJournal()
+    return journal
@@ -0,0 +1,145 @@
+"""
+Google Sheets gateway
+One authenticated gspread client per process, shared by every sheet operation.
+The service account is read once (GOOGLE_APPLICATION_CREDENTIALS_JSON, else
+GOOGLE_CREDENTIALS_PATH), requests go through one pooled keep-alive session,
+and spreadsheet and worksheet handles are cached, so a run exchanges one OAuth
+token and looks each spreadsheet title up once instead of once per call.
+Bulk writes go out as one request, which Sheets applies entirely or not at all.
+Every request is paced and retried by the request scheduler
+"""
+
+import os
+import json
+import logging
+import gspread
+from gspread.utils import rowcol_to_a1
+from google.oauth2.service_account import Credentials
+from google.auth.transport.requests import AuthorizedSession
+from requests.adapters import HTTPAdapter
+from config import *
+from request_scheduler import request_scheduler
+
+SHEETS_SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive',  # Opening a spreadsheet by title searches Drive
+]
+
+# POSTs that only read, set or clear cell values can be repeated; other POSTs
+# (structural batchUpdates such as delete_rows, appends, Drive copies) cannot
+IDEMPOTENT_POST_SUFFIXES = ('/values:batchGet', '/values:batchUpdate', '/values:batchClear', ':getByDataFilter')
+
+gateway = None
+
+
+class ScheduledClient(gspread.Client):
+    """gspread client whose requests go through the request scheduler (Drive's quota for title lookups)."""
+
+    def request(self, method, endpoint, *args, **kwargs):
+        api = 'drive' if endpoint.startswith('https://www.googleapis.com/drive/') else 'sheets'
+        idempotent = method != 'post' or endpoint.endswith(IDEMPOTENT_POST_SUFFIXES)
+        return request_scheduler().call(api, super().request, method, endpoint, *args,
+                                        idempotent=idempotent, **kwargs)
+
+
+class SheetsGateway:
+    """Lazily authenticated gspread client with cached spreadsheet and worksheet handles."""
+
+    def __init__(self, credentials_json=None, credentials_path=None):
+        self.credentials_json = credentials_json
+        self.credentials_path = credentials_path
+        self.gspread_client = None
+        self.spreadsheets = {}
+        self.worksheets = {}
+
+    def credentials(self):
+        credentials_json = self.credentials_json or os.getenv('GOOGLE_APPLICATION_CREDENTIALS_JSON')
+        if credentials_json:
+            return Credentials.from_service_account_info(json.loads(credentials_json), scopes=SHEETS_SCOPES)
+        credentials_path = self.credentials_path or GOOGLE_CREDENTIALS_PATH
+        if os.path.exists(credentials_path):
+            return Credentials.from_service_account_file(credentials_path, scopes=SHEETS_SCOPES)
+        raise Exception("GOOGLE_APPLICATION_CREDENTIALS_JSON environment variable not set.")
+
+    def client(self):
+        """The shared gspread client, authenticated on first use."""
+        if self.gspread_client is None:
+            credentials = self.credentials()
+            session = AuthorizedSession(credentials)
+            adapter = HTTPAdapter(pool_connections=SHEETS_HTTP_POOL_SIZE, pool_maxsize=SHEETS_HTTP_POOL_SIZE)
+            session.mount('https://', adapter)
+            self.gspread_client = ScheduledClient(auth=credentials, session=session)
+            logging.info("Authenticated the Google Sheets client")
+        return self.gspread_client
+
+    def spreadsheet(self, name=None, url=None, key=None):
+        """A spreadsheet by key, URL or title (title lookups are a Drive search, so all are cached)."""
+        cache_key = ('key', key) if key else ('url', url) if url else ('name', name)
+        if cache_key not in self.spreadsheets:
+            client = self.client()
+            if key:
+                self.spreadsheets[cache_key] = client.open_by_key(key)
+            elif url:
+                self.spreadsheets[cache_key] = client.open_by_url(url)
+            else:
+                self.spreadsheets[cache_key] = client.open(name)
+        return self.spreadsheets[cache_key]
+
+    def worksheet(self, name=None, index=0, url=None, key=None, title=None):
+        """A worksheet of a spreadsheet (see spreadsheet()), by title or else by index."""
+        cache_key = (key, url, name, title, None if title else index)
+        if cache_key not in self.worksheets:
+            spreadsheet = self.spreadsheet(name, url, key)
+            self.worksheets[cache_key] = spreadsheet.worksheet(title) if title else spreadsheet.get_worksheet(index)
+        return self.worksheets[cache_key]
+
+    def iter_columns(self, worksheet, cols, first_row=2, page_size=None):
+        """
+        Generator of (row, [value of each column]) over columns `cols` (1-based) from
+        first_row down, page_size (SHEETS_PAGE_SIZE) rows per batchGet request with one
+        range per column, so no other column is downloaded. Blank rows are yielded
+        with empty values, and the scan runs to the end of the grid: even a page
+        without any data may have more below it.
+        """
+        page_size = page_size or SHEETS_PAGE_SIZE
+        start = first_row
+        while start <= worksheet.row_count:
+            end = min(start + page_size - 1, worksheet.row_count)
+            ranges = [f"{rowcol_to_a1(start, col)}:{rowcol_to_a1(end, col)}" for col in cols]
+            # Sheets leaves out trailing empty rows and cells of each range, so a short
+            # page only means its last rows are blank, not that the data ends there
+            columns = [[row[0] if row else '' for row in column] for column in worksheet.batch_get(ranges)]
+            length = max(map(len, columns), default=0)
+            for offset in range(length):
+                yield start + offset, [column[offset] if offset < len(column) else '' for column in columns]
+            start = end + 1
+
+    def write_column(self, worksheet, col, values, first_row=2):
+        """Write values down column `col` (1-based) from first_row in a single range update."""
+        if not values:
+            return
+        range_name = f"{rowcol_to_a1(first_row, col)}:{rowcol_to_a1(first_row + len(values) - 1, col)}"
+        worksheet.update(range_name=range_name, values=[[value] for value in values])
+
+    def write_cells(self, worksheet, cells):
+        """Write {(row, col): value} (1-based) in a single values batchUpdate request."""
+        if not cells:
+            return
+        worksheet.batch_update([{'range': rowcol_to_a1(row, col), 'values': [[value]]}
+                                for (row, col), value in sorted(cells.items())])
+
+    def open_all(self):
+        return self.client().openall()
+
+    def reset(self):
+        """Forget the cached handles, e.g. after a worksheet was deleted or renamed."""
+        self.spreadsheets.clear()
+        self.worksheets.clear()
+
+
+def sheets_gateway():
+    """The process-wide SheetsGateway."""
+    global gateway
+    if gateway is None:
+        gateway = SheetsGateway()
+    return gateway
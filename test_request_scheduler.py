@@ -0,0 +1,50 @@
+"""
+Tests of which failed calls the request scheduler retries, against errors
+built the way gspread and requests raise them
+
+Usage: python -m pytest test_request_scheduler.py
+"""
+
+import json
+import pytest
+import requests
+from gspread.exceptions import APIError
+import request_scheduler
+from request_scheduler import RequestScheduler
+
+LIMITS = {'drive': {'rate': 1000.0, 'burst': 10}}
+
+
+def api_error(status, reason):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps({'error': {
+        'code': status, 'message': reason, 'errors': [{'reason': reason}],
+    }}).encode()
+    return APIError(response)
+
+
+def failing_call(errors):
+    """A call raising each of errors in turn, then returning 'ok'. calls counts the attempts."""
+    def call():
+        call.calls += 1
+        if errors:
+            raise errors.pop(0)
+        return 'ok'
+    call.calls = 0
+    return call
+
+
+def test_gspread_rate_limit_403_is_retried(monkeypatch):
+    monkeypatch.setattr(request_scheduler.time, 'sleep', lambda seconds: None)
+    call = failing_call([api_error(403, 'userRateLimitExceeded')])
+    assert RequestScheduler(LIMITS).call('drive', call, idempotent=False) == 'ok'
+    assert call.calls == 2
+
+
+def test_gspread_permission_403_is_not_retried(monkeypatch):
+    monkeypatch.setattr(request_scheduler.time, 'sleep', lambda seconds: None)
+    call = failing_call([api_error(403, 'insufficientFilePermissions')])
+    with pytest.raises(APIError):
+        RequestScheduler(LIMITS).call('drive', call)
+    assert call.calls == 1
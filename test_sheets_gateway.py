@@ -0,0 +1,100 @@
+"""
+Tests of the paged column reader (SheetsGateway.iter_columns) and the quote
+stream built on it, against an in-memory worksheet that trims trailing blank
+rows from each range the way the Sheets API does
+
+Usage: python -m pytest test_sheets_gateway.py
+"""
+
+from gspread.utils import a1_to_rowcol
+import main
+import sheet_journal
+import sheets_gateway
+from sheets_gateway import SheetsGateway
+
+
+class FakeWorksheet:
+    def __init__(self, header, rows, row_count=100):
+        self.header = header
+        self.rows = dict(rows)  # Sheet row -> list of cell values
+        self.row_count = row_count
+        self.requests = []
+
+    def row_values(self, row):
+        return list(self.header)
+
+    def cell_value(self, row, col):
+        values = self.rows.get(row, [])
+        return values[col - 1] if col <= len(values) else ''
+
+    def batch_get(self, ranges):
+        self.requests.append(ranges)
+        result = []
+        for range_name in ranges:
+            first, last = range_name.split(':')
+            (start, col), (end, _) = a1_to_rowcol(first), a1_to_rowcol(last)
+            values = [[self.cell_value(row, col)] if self.cell_value(row, col) else []
+                      for row in range(start, end + 1)]
+            while values and not values[-1]:
+                values.pop()
+            result.append(values)
+        return result
+
+    def col_values(self, col):
+        return [self.header[col - 1]] + [self.cell_value(row, col) for row in range(2, max(self.rows) + 1)]
+
+    def update(self, range_name, values):
+        raise AssertionError(f"unexpected write to {range_name}")
+
+
+def quote_rows(filled, used=()):
+    return {row: [f"quote {row}", f"author {row}", 'yes' if row in used else ''] for row in filled}
+
+
+def test_iter_columns_reads_past_a_blank_gap_across_pages():
+    # Rows 6-7 are blank: the first page (rows 2-6) comes back short, the data continues on the next
+    worksheet = FakeWorksheet(['Quote', 'Author', 'Used'], quote_rows([2, 3, 4, 5, 8, 9]))
+    rows = [(row, values[0]) for row, values in SheetsGateway().iter_columns(worksheet, [1], page_size=5)
+            if values[0]]
+    assert rows == [(2, 'quote 2'), (3, 'quote 3'), (4, 'quote 4'), (5, 'quote 5'),
+                    (8, 'quote 8'), (9, 'quote 9')]
+
+
+def test_iter_columns_reads_past_a_blank_page_to_the_end_of_the_grid():
+    # Rows 4-13 fill two whole pages (rows 2-6 come back short, 7-11 empty)
+    worksheet = FakeWorksheet(['Quote', 'Author', 'Used'], quote_rows([2, 3, 14]), row_count=20)
+    rows = [row for row, values in SheetsGateway().iter_columns(worksheet, [1, 2], page_size=5) if values[0]]
+    assert rows == [2, 3, 14]
+    assert len(worksheet.requests) == 4
+
+
+def streaming_agent(worksheet, tmp_path, monkeypatch):
+    """An agent streaming quotes from worksheet, 5 rows per page. agent.resets counts 'Used' resets."""
+    monkeypatch.setattr(sheets_gateway, 'gateway', SheetsGateway())
+    monkeypatch.setattr(sheet_journal, 'journal', sheet_journal.SheetJournal(str(tmp_path / 'journal.sqlite3')))
+    monkeypatch.setattr(sheets_gateway, 'SHEETS_PAGE_SIZE', 5)
+    agent = object.__new__(main.InstagramAIAgent)
+    agent.quotes_mirror = None
+    agent.quotes_worksheet = lambda: worksheet
+    agent.resets = 0
+
+    def reset_used_column(row_count):
+        agent.resets += 1
+        return False
+    agent.reset_used_column = reset_used_column
+    return agent
+
+
+def test_streamed_quote_below_a_gap_is_found_instead_of_resetting(tmp_path, monkeypatch):
+    worksheet = FakeWorksheet(['Quote', 'Author', 'Used'], quote_rows([2, 3, 4, 5, 8, 9], used=[2, 3, 4, 5]))
+    agent = streaming_agent(worksheet, tmp_path, monkeypatch)
+    assert agent.next_streamed_quote() == ('quote 8', 'author 8', 6)
+    assert agent.resets == 0
+
+
+def test_streamed_quote_below_a_full_page_gap_is_found_instead_of_resetting(tmp_path, monkeypatch):
+    # Rows 4-13 are blank: the page of rows 7-11 comes back with no data at all
+    worksheet = FakeWorksheet(['Quote', 'Author', 'Used'], quote_rows([2, 3, 14], used=[2, 3]))
+    agent = streaming_agent(worksheet, tmp_path, monkeypatch)
+    assert agent.next_streamed_quote() == ('quote 14', 'author 14', 12)
+    assert agent.resets == 0
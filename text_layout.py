@@ -0,0 +1,123 @@
+"""
+Text layout for the video renderer
+Caches fonts, per-glyph metrics and wrapped layouts so the same quotes can be
+laid out at several sizes without measuring them again
+"""
+
+import os
+import logging
+from functools import lru_cache
+from PIL import ImageFont
+from config import FONT_PATHS, LAYOUT_CACHE_SIZE
+
+
+def resolve_font_path():
+    """Return the first font in FONT_PATHS that exists, or None for PIL's default font."""
+    for font_path in FONT_PATHS:
+        if os.path.exists(font_path):
+            return font_path
+    return None
+
+
+@lru_cache(maxsize=None)
+def get_font(font_path, font_size):
+    """Load a font once per (path, size) instead of on every text clip."""
+    if font_path:
+        try:
+            font = ImageFont.truetype(font_path, font_size)
+            logging.info(f"Using font: {font_path} ({font_size}px)")
+            return font
+        except Exception as e:
+            logging.error(f"Error loading font {font_path}: {e}")
+    logging.warning("Using default font")
+    return ImageFont.load_default()
+
+
+class FontMetrics:
+    """Glyph advances, pair kerning and ink extents of one font, measured once per glyph."""
+
+    def __init__(self, font):
+        self.font = font
+        self.advances = {}
+        self.kerning = {}
+        self.extents = {}
+        self.words = {}
+
+    def advance(self, char):
+        if char not in self.advances:
+            self.advances[char] = self.font.getlength(char)
+        return self.advances[char]
+
+    def kern(self, left, right):
+        pair = left + right
+        if pair not in self.kerning:
+            self.kerning[pair] = self.font.getlength(pair) - self.advance(left) - self.advance(right)
+        return self.kerning[pair]
+
+    def extent(self, char):
+        """Ink (left, right) of a single glyph relative to its pen position."""
+        if char not in self.extents:
+            bbox = self.font.getbbox(char)
+            self.extents[char] = (bbox[0], bbox[2])
+        return self.extents[char]
+
+    def word_advance(self, word):
+        """Pen advance of a run of glyphs, kerning included."""
+        if word not in self.words:
+            advance = self.advance(word[0])
+            for left, right in zip(word, word[1:]):
+                advance += self.kern(left, right) + self.advance(right)
+            self.words[word] = advance
+        return self.words[word]
+
+    def join_advance(self, pen, last_char, word):
+        """Pen advance after appending ' ' + word to a line that ends in last_char."""
+        space = self.kern(last_char, ' ') + self.advance(' ') + self.kern(' ', word[0])
+        return pen + space + self.word_advance(word)
+
+    def line_width(self, pen, first_char, last_char):
+        """Width of the line's bounding box, as ImageDraw.textbbox reports it."""
+        left = min(0, self.extent(first_char)[0])
+        right = max(pen, pen - self.advance(last_char) + self.extent(last_char)[1])
+        return right - left
+
+
+@lru_cache(maxsize=None)
+def get_metrics(font_path, font_size):
+    return FontMetrics(get_font(font_path, font_size))
+
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def layout_text(text, font_path, font_size, max_width):
+    """
+    Greedily wrap text into lines no wider than max_width.
+    Lines grow one word at a time from the running pen position, so each word is
+    measured once. Returns a tuple of (line, width) pairs.
+    """
+    metrics = get_metrics(font_path, font_size)
+    lines = []
+    current_line = []
+    pen = 0
+    for word in text.split():
+        if current_line:
+            test_pen = metrics.join_advance(pen, current_line[-1][-1], word)
+            first_char = current_line[0][0]
+        else:
+            test_pen = metrics.word_advance(word)
+            first_char = word[0]
+        if metrics.line_width(test_pen, first_char, word[-1]) <= max_width:
+            current_line.append(word)
+            pen = test_pen
+        else:
+            if current_line:
+                lines.append((current_line, pen))
+                current_line = [word]
+                pen = metrics.word_advance(word)
+            else:
+                lines.append(([word], metrics.word_advance(word)))
+    if current_line:
+        lines.append((current_line, pen))
+    return tuple(
+        (' '.join(words), round(metrics.line_width(line_pen, words[0][0], words[-1][-1])))
+        for words, line_pen in lines
+    )
@@ -1,24 +1,206 @@
 import os
+import math
 import random
 import logging
 from datetime import datetime
 from moviepy.editor import *
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
+from PIL import Image, ImageColor, ImageDraw, ImageFont, ImageFilter
 import numpy as np
 from config import *
+from text_layout import get_font, layout_text, resolve_font_path
+from encoding import get_encoding_profile, moviepy_write_kwargs
+from audio_cache import is_audio_segment, prepare_audio_segment
+import fast_blur
+from metrics import stage
+from memory_budget import describe_plan, fitting_plans
+
+
+# Scratch buffers of render_diamond_blur by frame shape, least recently used first
+DIAMOND_BLUR_BUFFERS = {}
+DIAMOND_BLUR_BUFFER_SHAPES = 4  # Enough for the quote and author layers of a few videos
+
+
+def frame_count(duration, fps):
+    """Frames MoviePy's write_videofile emits for a clip of `duration` seconds (one per np.arange step)."""
+    return len(np.arange(0, duration, 1.0 / fps))
+
+
+def use_numpy_blur(radius):
+    """Whether BLUR_BACKEND sends a blur of this radius to fast_blur."""
+    if BLUR_BACKEND == 'numpy':
+        return True
+    return BLUR_BACKEND == 'auto' and radius >= BLUR_NUMPY_MIN_RADIUS
+
+
+def gaussian_blur_frame(frame, radius):
+    """Gaussian-blur an RGB frame or a float [0, 1] mask frame with the BLUR_BACKEND."""
+    if use_numpy_blur(radius):
+        return fast_blur.gaussian_blur(frame, radius)
+    if frame.dtype == np.uint8:
+        return np.array(Image.fromarray(frame).filter(ImageFilter.GaussianBlur(radius=radius)))
+    # MoviePy masks are float arrays, which PIL can only blur as 8-bit images
+    mask = Image.fromarray(np.round(frame * 255).astype(np.uint8))
+    blurred = mask.filter(ImageFilter.GaussianBlur(radius=radius))
+    return np.array(blurred) / 255.0
+
+
+def gaussian_blur_levels(frame, radii):
+    """
+    gaussian_blur_frame of one frame at each of radii. The radii the BLUR_BACKEND
+    sends to fast_blur are blurred together in one batch.
+    """
+    blurred = [None] * len(radii)
+    batch = [i for i, radius in enumerate(radii) if use_numpy_blur(radius)]
+    if batch:
+        frames = np.broadcast_to(frame, (len(batch),) + frame.shape)
+        for i, level in zip(batch, fast_blur.gaussian_blur_batch(frames, [radii[i] for i in batch])):
+            blurred[i] = level
+    for i, radius in enumerate(radii):
+        if blurred[i] is None:
+            blurred[i] = gaussian_blur_frame(frame, radius)
+    return blurred
+
+
+def outline_coverage(glyph_mask, radius):
+    """
+    Coverage left by drawing a glyph mask at every offset of a (2*radius+1) square,
+    i.e. 1 - prod(1 - m) over the window. The product is separable, so it is
+    computed as a row pass and a column pass instead of one draw per offset.
+    """
+    clear = 1 - glyph_mask.astype(np.float32) / 255
+    rows = clear.copy()
+    for d in range(1, radius + 1):
+        rows[:, d:] *= clear[:, :-d]
+        rows[:, :-d] *= clear[:, d:]
+    window = rows.copy()
+    for d in range(1, radius + 1):
+        window[d:] *= rows[:-d]
+        window[:-d] *= rows[d:]
+    return 1 - window
+
+
+def render_blur(frame, strength):
+    """The 'blur' effect at a given strength (0..1)."""
+    return gaussian_blur_frame(frame, BLUR_MAX_RADIUS * strength)
+
+
+def render_blur_levels(frame, strengths):
+    """render_blur at each of strengths."""
+    return gaussian_blur_levels(frame, [BLUR_MAX_RADIUS * strength for strength in strengths])
+
+
+def diamond_blur_buffers(shape):
+    """Two float64 scratch arrays of the given shape, reused between calls."""
+    buffers = DIAMOND_BLUR_BUFFERS.pop(shape, None)
+    if buffers is None:
+        buffers = (np.empty(shape), np.empty(shape))
+        if len(DIAMOND_BLUR_BUFFERS) >= DIAMOND_BLUR_BUFFER_SHAPES:
+            DIAMOND_BLUR_BUFFERS.pop(next(iter(DIAMOND_BLUR_BUFFERS)))
+    DIAMOND_BLUR_BUFFERS[shape] = buffers  # Most recently used last
+    return buffers
+
+
+def render_diamond_blur(frame, strength):
+    """
+    The 'diamond_blur' effect: 3 blurred layers at 30% weight averaged with the sharp frame.
+    The layers are summed in place into reused scratch buffers, in the order np.mean
+    adds them, so the result is identical without stacking four float64 copies.
+    """
+    return combine_diamond_blur(frame, (gaussian_blur_frame(frame, b * strength) for b in DIAMOND_BLUR_RADII))
+
+
+def render_diamond_blur_levels(frame, strengths):
+    """render_diamond_blur at each of strengths, with every layer of every strength blurred in one batch."""
+    layers = gaussian_blur_levels(frame, [b * strength for strength in strengths for b in DIAMOND_BLUR_RADII])
+    count = len(DIAMOND_BLUR_RADII)
+    return [combine_diamond_blur(frame, layers[i:i + count]) for i in range(0, len(layers), count)]
+
+
+def combine_diamond_blur(frame, layers):
+    total, layer = diamond_blur_buffers(frame.shape)
+    np.copyto(total, frame)
+    for blurred in layers:
+        np.multiply(blurred, 0.3, out=layer)
+        total += layer
+    total /= len(DIAMOND_BLUR_RADII) + 1
+    return total.astype(frame.dtype)
+
+
+class TextLayer:
+    """
+    A text layer cropped to its ink bounding box plus blur padding.
+    Stored as two 8-bit planes, total coverage (alpha) and fill coverage, and two
+    constant colours: RGB = fill * color + (alpha - fill) * outline_color.
+    """
+    def __init__(self, position, alpha, fill, color, outline_color):
+        self.position = position  # Top-left corner of the crop in the video frame
+        self.alpha = alpha
+        self.fill = fill
+        self.color = ImageColor.getrgb(color)[:3]
+        self.outline_color = ImageColor.getrgb(outline_color)[:3]
+
+    @property
+    def size(self):
+        return self.alpha.shape[1], self.alpha.shape[0]
+
+    def rgb(self):
+        fill = self.fill.astype(np.float32) / 255
+        outline = (self.alpha.astype(np.float32) - self.fill) / 255
+        rgb = fill[..., None] * np.array(self.color, dtype=np.float32)
+        if any(self.outline_color):
+            rgb += outline[..., None] * np.array(self.outline_color, dtype=np.float32)
+        return np.round(rgb).astype(np.uint8)
+
+    def to_clip(self, duration):
+        clip = ImageClip(self.rgb(), duration=duration)
+        clip.mask = ImageClip(self.alpha.astype(np.float32) / 255, ismask=True, duration=duration)
+        return clip.set_position(self.position)
+
+
+class BlurLevelCache:
+    """
+    Memoizes a blur-style effect over a static text layer.
+    The effect strength (0..1) is snapped to BLUR_CACHE_LEVELS steps, so the
+    expensive render runs once per level instead of once per frame. A strength
+    of zero returns the source frame untouched. With render_levels(frame,
+    strengths) and a numpy BLUR_BACKEND, every level is rendered in one call the
+    first time a frame is seen.
+    """
+    def __init__(self, render, levels=None, render_levels=None):
+        self.render = render
+        self.levels = levels or BLUR_CACHE_LEVELS
+        self.render_levels = render_levels if BLUR_BACKEND in ('numpy', 'auto') else None
+        self.frames = {}
+
+    def level(self, strength):
+        if strength <= 0:
+            return 0
+        return min(self.levels, int(math.ceil(strength * self.levels)))
+
+    def __call__(self, frame, strength):
+        level = self.level(strength)
+        if level == 0:
+            return frame
+        # The same filter runs on the RGB frame and on the mask, keep them apart
+        key = (level, frame.shape, frame.dtype.str)
+        if key not in self.frames:
+            if self.render_levels:
+                strengths = [n / self.levels for n in range(1, self.levels + 1)]
+                for n, rendered in enumerate(self.render_levels(frame, strengths), 1):
+                    self.frames[(n,) + key[1:]] = rendered
+            else:
+                self.frames[key] = self.render(frame, level / self.levels)
+        return self.frames[key]
+
 
 class VideoCreator:
     def __init__(self):
-        pass
+        self.background = None
 
     def create_video_with_pil_text(self, quote_text, author_text, music_file):
         logging.info("Starting video creation with random effects...")
         try:
-            background = ColorClip(
-                size=(VIDEO_WIDTH, VIDEO_HEIGHT),
-                color=BACKGROUND_COLOR,
-                duration=VIDEO_DURATION_SECONDS
-            )
+            background = self.background_clip()
             quote_clip = self.create_text_with_random_effect(
                 f'"{quote_text}"', 
                 QUOTE_FONT_SIZE, 
@@ -38,15 +220,15 @@ class VideoCreator:
             if quote_clip is None or author_clip is None:
                 logging.error("Failed to create text clips")
                 return None
-            audio = AudioFileClip(music_file).set_duration(VIDEO_DURATION_SECONDS)
-            final_video = CompositeVideoClip([background, quote_clip, author_clip])
-            final_video.audio = audio
+            final_video = self.reuse_static_frames(
+                CompositeVideoClip([background, quote_clip, author_clip]), [quote_clip, author_clip])
             final_video.fps = VIDEO_FPS
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"instagram_video_{timestamp}.mp4"
-            final_video.write_videofile(filename, codec='libx264', audio_codec='aac')
-            final_video.close()
-            audio.close()
+            audio_file = music_file
+            if AUDIO_CACHE_ENABLED and not is_audio_segment(music_file):
+                audio_file = prepare_audio_segment(music_file)
+            self.write_video(final_video, audio_file, filename)
             logging.info(f"Video with random effects created: {filename}")
             if music_file and music_file.startswith("temp_") and os.path.exists(music_file):
                 os.remove(music_file)
@@ -63,25 +245,9 @@ class VideoCreator:
         """
         logging.info(f"Starting video creation with blur keyframe and effect: {effect}...")
         try:
-            background = ColorClip(
-                size=(VIDEO_WIDTH, VIDEO_HEIGHT),
-                color=BACKGROUND_COLOR,
-                duration=VIDEO_DURATION_SECONDS
-            )
-            # 1. Main effect (entire video, no separate keyframe)
-            quote_clip = self.create_text_with_effect(
-                quote_text, QUOTE_FONT_SIZE, QUOTE_COLOR, 'center', VIDEO_WIDTH - 300, 0, effect, duration=VIDEO_DURATION_SECONDS)
-            author_clip = self.create_text_with_effect(
-                f"- {author_text}", AUTHOR_FONT_SIZE, AUTHOR_COLOR, (0, int(VIDEO_HEIGHT * 0.75)), VIDEO_WIDTH - 200, TEXT_STAGGER_DELAY, effect, duration=VIDEO_DURATION_SECONDS)
-            audio = AudioFileClip(music_file).set_duration(VIDEO_DURATION_SECONDS)
-            final_video = CompositeVideoClip([background, quote_clip, author_clip])
-            final_video.audio = audio
-            final_video.fps = VIDEO_FPS
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"instagram_video_{timestamp}.mp4"
-            final_video.write_videofile(filename, codec='libx264', audio_codec='aac')
-            final_video.close()
-            audio.close()
+            self.render_video(quote_text, author_text, effect, music_file, filename)
             logging.info(f"Video with blur keyframe and effect created: {filename}")
             if music_file and music_file.startswith("temp_") and os.path.exists(music_file):
                 os.remove(music_file)
@@ -91,20 +257,108 @@ class VideoCreator:
             logging.error(f"Error creating video with blur keyframe and effect: {e}")
             return None
 
+    def render_video(self, quote_text, author_text, effect, music_file, filename, render_mode=None, audio=None):
+        """
+        Render the quote video to filename with RENDER_MODE (or render_mode). With
+        AUDIO_CACHE_ENABLED the music is muxed from its cached AAC segment. Over
+        MEMORY_BUDGET_MB, or after a MemoryError, a lower-memory plan is used.
+        """
+        if AUDIO_CACHE_ENABLED and not is_audio_segment(music_file):
+            music_file = prepare_audio_segment(music_file)
+        plans = fitting_plans(render_mode or RENDER_MODE)
+        for i, plan in enumerate(plans):
+            try:
+                return self.render_plan(quote_text, author_text, effect, music_file, filename, plan, audio)
+            except MemoryError:
+                if i == len(plans) - 1:
+                    raise
+                logging.error(f"Out of memory rendering with {describe_plan(plan)}, "
+                              f"retrying with {describe_plan(plans[i + 1])}")
+
+    def render_plan(self, quote_text, author_text, effect, music_file, filename, plan, audio=None):
+        """Render with one memory_budget plan: render mode, parallel workers and encoder threads."""
+        render_mode = plan['render_mode']
+        if render_mode not in ('parallel', 'pipe'):
+            with stage('compose', render_mode=render_mode):
+                final_video = self.build_video(quote_text, author_text, effect)
+        # The parallel and pipe modes lay out, render and encode in one pass
+        with stage('encode', render_mode=render_mode) as encode:
+            if render_mode == 'parallel':
+                from parallel_render import render_parallel
+                render_parallel(quote_text, author_text, effect, music_file, filename, plan['workers'])
+            elif render_mode == 'pipe':
+                from pipe_render import render_pipe
+                render_pipe(quote_text, author_text, effect, music_file, filename, plan['encoder_threads'])
+            else:
+                self.write_video(final_video, music_file, filename, audio)
+            encode.bytes = os.path.getsize(filename)
+        return filename
+
+    def write_video(self, final_video, music_file, filename, audio=None):
+        """
+        Encode final_video with its music and close it. A cached audio segment is
+        muxed as is; any other music_file (or an already decoded `audio` clip of it,
+        which is left open) is trimmed and encoded to AAC.
+        """
+        write_kwargs = moviepy_write_kwargs(get_encoding_profile())
+        if is_audio_segment(music_file):
+            final_video.write_videofile(filename, audio=music_file, **write_kwargs)
+            final_video.close()
+            return filename
+        shared_audio = audio is not None
+        if not shared_audio:
+            audio = AudioFileClip(music_file)
+        final_video.audio = audio.set_duration(VIDEO_DURATION_SECONDS)
+        final_video.write_videofile(filename, audio_codec='aac', **write_kwargs)
+        if shared_audio:
+            # Closing the composite would close the shared reader too
+            final_video.audio = None
+        final_video.close()
+        if not shared_audio:
+            audio.close()
+        return filename
+
+    def background_clip(self):
+        """The solid background, built once and shared by every video of this creator."""
+        if self.background is None:
+            self.background = ColorClip(
+                size=(VIDEO_WIDTH, VIDEO_HEIGHT),
+                color=BACKGROUND_COLOR,
+                duration=VIDEO_DURATION_SECONDS
+            )
+        return self.background
+
+    def build_video(self, quote_text, author_text, effect):
+        """Compose the background and both text layers with `effect`. The clip has no audio."""
+        background = self.background_clip()
+        # 1. Main effect (entire video, no separate keyframe)
+        quote_clip, author_clip = [
+            self.create_text_with_effect(*spec, effect, duration=VIDEO_DURATION_SECONDS)
+            for spec in self.text_layer_specs(quote_text, author_text)
+        ]
+        final_video = self.reuse_static_frames(
+            CompositeVideoClip([background, quote_clip, author_clip]), [quote_clip, author_clip])
+        final_video.fps = VIDEO_FPS
+        return final_video
+
+    def video_duration(self, quote_text, author_text):
+        """Length of the composite build_video returns: the last text layer starts at its delay and runs VIDEO_DURATION_SECONDS."""
+        return max(spec[5] for spec in self.text_layer_specs(quote_text, author_text)) + VIDEO_DURATION_SECONDS
+
+    def text_layer_specs(self, quote_text, author_text):
+        """(text, font_size, color, position, max_width, delay) of the quote and author layers."""
+        return [
+            (quote_text, QUOTE_FONT_SIZE, QUOTE_COLOR, 'center', VIDEO_WIDTH - 300, 0),
+            (f"- {author_text}", AUTHOR_FONT_SIZE, AUTHOR_COLOR, (0, int(VIDEO_HEIGHT * 0.75)), VIDEO_WIDTH - 200, TEXT_STAGGER_DELAY),
+        ]
+
     def create_text_with_effect(self, text, font_size, color, position='center', max_width=None, delay=0, effect='fade', duration=None):
         try:
             base_clip = self.create_text_image(text, font_size, color, position, max_width)
             if base_clip is None:
                 return None
             base_clip = base_clip.set_duration(duration) if duration else base_clip
-            if effect == 'fade':
-                return self.apply_fade_effect(base_clip, delay)
-            elif effect == 'blur':
-                return self.apply_blur_effect(base_clip, delay)
-            elif effect == 'diamond_blur':
-                return self.apply_diamond_blur_effect(base_clip, delay)
-            else:
-                return self.apply_fade_effect(base_clip, delay)
+            return self.apply_effect(base_clip, effect, delay)
         except Exception as e:
             logging.error(f"Error creating text with effect: {e}")
             return None
@@ -116,146 +370,140 @@ class VideoCreator:
                 return None
             effect = random.choice(AVAILABLE_EFFECTS)
             logging.info(f"Applying effect: {effect}")
-            if effect == 'fade':
-                return self.apply_fade_effect(base_clip, delay)
-            elif effect == 'blur':
-                return self.apply_blur_effect(base_clip, delay)
-            elif effect == 'diamond_blur':
-                return self.apply_diamond_blur_effect(base_clip, delay)
-            else:
-                return self.apply_fade_effect(base_clip, delay)
+            return self.apply_effect(base_clip, effect, delay)
         except Exception as e:
             logging.error(f"Error creating text with random effect: {e}")
             return None
 
     def create_text_image(self, text, font_size, color, position='center', max_width=None):
         try:
-            img = Image.new('RGBA', (VIDEO_WIDTH, VIDEO_HEIGHT), (0, 0, 0, 0))
-            draw = ImageDraw.Draw(img)
-            font = None
-            font_paths = [
-                "fonts/HelveticaNeue-UltraLight.ttf"  # Only use Helvetica Neue Ultra Light
-            ]
-            for font_path in font_paths:
-                try:
-                    font = ImageFont.truetype(font_path, font_size)
-                    logging.info(f"Using font: {font_path}")
-                    break
-                except:
-                    continue
-            if font is None:
-                font = ImageFont.load_default()
-                logging.warning("Using default font")
-            if max_width is None:
-                max_width = VIDEO_WIDTH - 200
-            def wrap_text(text, font, max_width):
-                words = text.split()
-                lines = []
-                current_line = []
-                for word in words:
-                    test_line = ' '.join(current_line + [word])
-                    bbox = draw.textbbox((0, 0), test_line, font=font)
-                    text_width = bbox[2] - bbox[0]
-                    if text_width <= max_width:
-                        current_line.append(word)
-                    else:
-                        if current_line:
-                            lines.append(' '.join(current_line))
-                            current_line = [word]
-                        else:
-                            lines.append(word)
-                if current_line:
-                    lines.append(' '.join(current_line))
-                return lines
-            wrapped_lines = wrap_text(text, font, max_width)
-            logging.info(f"Text wrapped into {len(wrapped_lines)} lines: {wrapped_lines}")
-            line_height = font_size + 15
-            total_height = len(wrapped_lines) * line_height
-            if position == 'center':
-                x = (VIDEO_WIDTH - max_width) // 2
-                y = (VIDEO_HEIGHT - total_height) // 2
-                y = max(50, min(y, VIDEO_HEIGHT - total_height - 50))
-            else:
-                x, y = position
-            # Draw each line with a much thicker black outline for boldness
-            outline_width = max(4, font_size // 8)  # Increased thickness
-            outline_color = 'black'
-            for i, line in enumerate(wrapped_lines):
-                line_y = y + (i * line_height)
-                bbox = draw.textbbox((0, 0), line, font=font)
-                line_width = bbox[2] - bbox[0]
-                line_x = (VIDEO_WIDTH - line_width) // 2
-                line_x = max(50, min(line_x, VIDEO_WIDTH - line_width - 50))
-                # Draw outline
-                for ox in range(-outline_width, outline_width+1):
-                    for oy in range(-outline_width, outline_width+1):
-                        if ox != 0 or oy != 0:
-                            draw.text((line_x+ox, line_y+oy), line, font=font, fill=outline_color)
-                # Draw main text
-                draw.text((line_x, line_y), line, fill=color, font=font)
-            img_array = np.array(img)
-            clip = ImageClip(img_array, duration=VIDEO_DURATION_SECONDS)
-            return clip
+            layer = self.create_text_layer(text, font_size, color, position, max_width)
+            return layer.to_clip(VIDEO_DURATION_SECONDS)
         except Exception as e:
             logging.error(f"Error creating text image: {e}")
             return None
 
-    def apply_fade_effect(self, base_clip, delay=0):
-        try:
-            # More intense: start fully transparent, fade in quickly
-            fade_in = base_clip.fadein(TEXT_FADE_IN_DURATION * 0.5)  # Faster fade-in
-            fade_out = fade_in.fadeout(TEXT_FADE_OUT_DURATION)
-            return fade_out.set_start(delay)
-        except Exception as e:
-            logging.error(f"Error applying fade effect: {e}")
-            return base_clip.set_start(delay)
+    def create_text_layer(self, text, font_size, color, position='center', max_width=None):
+        """Lay out and rasterize text into a TextLayer cropped to its bounding box."""
+        font_path = resolve_font_path()
+        font = get_font(font_path, font_size)
+        if max_width is None:
+            max_width = VIDEO_WIDTH - 200
+        layout = layout_text(text, font_path, font_size, max_width)
+        wrapped_lines = [line for line, _ in layout]
+        logging.info(f"Text wrapped into {len(wrapped_lines)} lines: {wrapped_lines}")
+        line_height = font_size + 15
+        total_height = len(wrapped_lines) * line_height
+        if position == 'center':
+            x = (VIDEO_WIDTH - max_width) // 2
+            y = (VIDEO_HEIGHT - total_height) // 2
+            y = max(50, min(y, VIDEO_HEIGHT - total_height - 50))
+        else:
+            x, y = position
+        # Draw each line with a much thicker black outline for boldness
+        outline_width = max(4, font_size // 8)  # Increased thickness
+        outline_color = 'black'
+        origins = []
+        boxes = []
+        for i, (line, line_width) in enumerate(layout):
+            line_y = y + (i * line_height)
+            line_x = (VIDEO_WIDTH - line_width) // 2
+            line_x = max(50, min(line_x, VIDEO_WIDTH - line_width - 50))
+            bbox = font.getbbox(line)
+            origins.append((line_x, line_y))
+            boxes.append((line_x + bbox[0], line_y + bbox[1], line_x + bbox[2], line_y + bbox[3]))
+        # Crop to the ink plus the outline and enough room for the blur to spread
+        pad = outline_width + TEXT_LAYER_PADDING
+        if boxes:
+            left = max(0, min(b[0] for b in boxes) - pad)
+            top = max(0, min(b[1] for b in boxes) - pad)
+            right = min(VIDEO_WIDTH, max(b[2] for b in boxes) + pad)
+            bottom = min(VIDEO_HEIGHT, max(b[3] for b in boxes) + pad)
+        else:
+            left, top, right, bottom = 0, 0, 1, 1
+        # Rasterize each line once; the outline is grown from this glyph mask
+        glyph_mask = Image.new('L', (right - left, bottom - top), 0)
+        mask_draw = ImageDraw.Draw(glyph_mask)
+        for line, (line_x, line_y) in zip(wrapped_lines, origins):
+            mask_draw.text((line_x - left, line_y - top), line, font=font, fill=255)
+        fill = np.array(glyph_mask)
+        # The window includes the glyph itself, which is what drawing the fill on top adds
+        alpha = np.round(255 * outline_coverage(fill, outline_width)).astype(np.uint8)
+        return TextLayer((left, top), alpha, fill, color, outline_color)
 
-    def apply_blur_effect(self, base_clip, delay=0):
+    def apply_effect(self, base_clip, effect, delay=0):
+        """
+        Animate base_clip with a registered effect. Its keyframe table is evaluated
+        once here; per frame the clip only looks values up (and blurs through a
+        BlurLevelCache). Unknown effects, and effects that fail, fall back to 'fade'.
+        """
+        from effects import get_effect
+        effect = get_effect(effect)
         try:
-            # More intense: start with strong blur, animate to clear
-            duration = base_clip.duration
-            def blur_dynamic(get_frame, t):
-                # Blur is strong at start, 0 at 1s
-                max_blur = 20
-                blur_amount = max_blur * max(0, 1 - t/1.0)  # 1s to clear
-                frame = get_frame(t)
-                pil_img = Image.fromarray(frame)
-                if blur_amount > 0:
-                    blurred = pil_img.filter(ImageFilter.GaussianBlur(radius=blur_amount))
-                    return np.array(blurred)
-                else:
-                    return frame
-            blurred = base_clip.fl(blur_dynamic, apply_to=['mask'])
-            # No fade in/out, just blur to clear
-            return blurred.set_start(delay)
+            table = effect.keyframes(base_clip.duration)
+            clip = base_clip
+            if 'blur' in table.values:
+                blur_cache = BlurLevelCache(effect.blur_render, render_levels=effect.blur_render_levels)
+                def blur_frame(get_frame, t):
+                    return blur_cache(get_frame(t), table.value('blur', t))
+                clip = clip.fl(blur_frame, apply_to=['mask'])
+            if 'brightness' in table.values:
+                # Color only, like MoviePy's fadein/fadeout
+                clip = clip.fl(lambda get_frame, t: table.value('brightness', t) * get_frame(t))
+            return self.set_change_spans(clip.set_start(delay), table.change_spans())
         except Exception as e:
-            logging.error(f"Error applying blur effect: {e}")
-            return self.apply_fade_effect(base_clip, delay)
+            logging.error(f"Error applying {effect.name} effect: {e}")
+            if effect.name == 'fade':
+                return base_clip.set_start(delay)
+            return self.apply_effect(base_clip, 'fade', delay)
 
-    def apply_diamond_blur_effect(self, base_clip, delay=0):
-        try:
-            # More intense: start with more/larger blurred layers, animate to clear
-            duration = base_clip.duration
-            def diamond_blur_dynamic(get_frame, t):
-                # At t=0, 3 layers of blur, fade to clear by t=1s
-                max_blur = [30, 20, 10]
-                blur_factors = [max(0, 1 - t/1.0) for _ in max_blur]
-                frame = get_frame(t)
-                pil_img = Image.fromarray(frame)
-                layers = [np.array(pil_img)]
-                for b, f in zip(max_blur, blur_factors):
-                    if f > 0:
-                        blurred = pil_img.filter(ImageFilter.GaussianBlur(radius=b * f))
-                        layers.append(np.array(blurred) * 0.3)
-                # Composite: average the layers
-                composite = np.mean(layers, axis=0).astype(np.uint8)
-                return composite
-            diamond_blurred = base_clip.fl(diamond_blur_dynamic, apply_to=['mask'])
-            # No fade in/out, just blur to clear
-            return diamond_blurred.set_start(delay)
-        except Exception as e:
-            logging.error(f"Error applying diamond blur effect: {e}")
-            return self.apply_fade_effect(base_clip, delay)
+    def set_change_spans(self, clip, spans):
+        """
+        Record when a text layer's frames change, as (start, end) pairs in video time.
+        `spans` are in clip time; the layer's appearance and end count as changes too.
+        """
+        clip.change_spans = [(clip.start + a, clip.start + b) for a, b in spans]
+        clip.change_spans.append((clip.start, clip.start))
+        if clip.end is not None:
+            clip.change_spans.append((clip.end, clip.end))
+        return clip
+
+    def find_static_spans(self, layers, duration):
+        """Return the (start, end) gaps in [0, duration] where none of the layers change."""
+        if any(getattr(layer, 'change_spans', None) is None for layer in layers):
+            return []
+        changes = sorted(span for layer in layers for span in layer.change_spans)
+        static_spans = []
+        cursor = 0
+        for start, end in changes:
+            if start - cursor > 1.0 / VIDEO_FPS:
+                static_spans.append((cursor, min(start, duration)))
+            cursor = max(cursor, end)
+        if duration - cursor > 1.0 / VIDEO_FPS:
+            static_spans.append((cursor, duration))
+        return [(a, b) for a, b in static_spans if a < b]
+
+    def reuse_static_frames(self, video, layers):
+        """
+        Serve every frame inside a static span from one composited frame instead of
+        recompositing all layers. Layers without change_spans disable the reuse.
+        """
+        static_spans = self.find_static_spans(layers, video.duration)
+        if not static_spans:
+            return video
+        static_time = sum(b - a for a, b in static_spans)
+        logging.info(f"Reusing composited frames for {static_time:.1f}s of {video.duration}s")
+        last = {'span': None, 'frame': None}
+        def frame_reuse(get_frame, t):
+            for span in static_spans:
+                # Spans are open intervals; the frames on their edges can still differ
+                if span[0] < t < span[1]:
+                    if last['span'] != span:
+                        last['span'] = span
+                        last['frame'] = get_frame(t)
+                    return last['frame']
+            return get_frame(t)
+        return video.fl(frame_reuse)
 
     def pil_blur_imageclip(self, image_clip, blur_radius):
         # Convert ImageClip to PIL Image, apply GaussianBlur, return new ImageClip